@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Detección de anomalías en métricas de canales y videos.
+
+Marca, para todos los canales a la vez (sin recorrerlos uno por uno):
+
+ - salto_suscriptores / salto_vistas: el delta mensual se aleja de la historia
+   del canal (mediana y MAD de los VENTANA meses anteriores) con z robusto
+   |z| > UMBRAL_Z. Si el canal todavía no tiene MIN_HISTORIA meses, se compara
+   el crecimiento % contra el resto de los canales de ese mes.
+ - vistas_negativas: VistasTotales bajó respecto del reporte anterior.
+ - baja: el canal estaba en el reporte anterior y no en este
+   (p. ej. "Canal no encontrado" en youtube_report.py).
+ - cambio_nombre: el nombre del canal cambió respecto del mes anterior.
+ - vistas_video / vistas_short: un video o Short tiene muchas más vistas que
+   el resto de los del mismo canal en el mes (z robusto sobre log(vistas)).
+
+z robusto = 0.6745 · (x − mediana) / MAD.
+
+Salida: data/informes/anomalias.csv, que consultan analyze_all.py y los
+rankings mensuales.
+
+Uso:
+    python extractor/anomalias.py
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from cubo_rollup import RAIZ, construir_cubo, fuentes_por_periodo, rebanada
+from instrumentacion import iniciar_instrumentacion
+
+ANOMALIAS_FILE = RAIZ / "data" / "informes" / "anomalias.csv"
+COLUMNAS = ["periodo", "nivel", "canal", "nombre", "video_id", "bandera", "valor", "referencia", "z", "metodo"]
+
+VENTANA = 6          # meses de historia del canal
+MIN_HISTORIA = 3     # meses mínimos para usar la historia propia
+MIN_VIDEOS = 5       # videos mínimos del canal en el mes para comparar entre ellos
+UMBRAL_Z = 3.5
+K_MAD = 0.6745
+
+
+def _nanmedian(valores, axis):
+    # Filas/ventanas enteramente vacías devuelven NaN sin advertencia
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmedian(valores, axis=axis)
+
+
+def z_robusto(valores, mediana, mad):
+    """z robusto con un piso para la MAD: evita z infinitos en series casi constantes."""
+    piso = np.fmax(0.05 * np.abs(mediana), 1.0)
+    return K_MAD * (valores - mediana) / np.fmax(mad, piso)
+
+
+def historia_movil(valores, ventana=VENTANA, minimo=MIN_HISTORIA):
+    """Mediana y MAD de los `ventana` meses anteriores a cada mes (sin incluirlo), por fila."""
+    n_filas, n_meses = valores.shape
+    relleno = np.full((n_filas, ventana), np.nan)
+    ventanas = sliding_window_view(np.hstack([relleno, valores]), ventana, axis=1)[:, :n_meses]
+    mediana = _nanmedian(ventanas, axis=2)
+    mad = _nanmedian(np.abs(ventanas - mediana[..., None]), axis=2)
+    suficientes = (~np.isnan(ventanas)).sum(axis=2) >= minimo
+    return np.where(suficientes, mediana, np.nan), np.where(suficientes, mad, np.nan)
+
+
+def transversal(valores):
+    """Mediana y MAD entre canales para cada mes (columna)."""
+    mediana = _nanmedian(valores, axis=0)
+    mad = _nanmedian(np.abs(valores - mediana), axis=0)
+    return np.broadcast_to(mediana, valores.shape), np.broadcast_to(mad, valores.shape)
+
+
+def _a_filas(mascara, ancho, bandera, **columnas):
+    """Convierte las celdas marcadas de matrices canal × mes en filas de la tabla de banderas."""
+    i, j = np.nonzero(mascara)
+    filas = pd.DataFrame({
+        "periodo": ancho.columns[j],
+        "nivel": "canal",
+        "canal": ancho.index[i],
+        "bandera": bandera,
+    })
+    for col, valor in columnas.items():
+        filas[col] = np.asarray(valor)[i, j] if np.ndim(valor) == 2 else valor
+    return filas
+
+
+def anomalias_canales(cubo):
+    base = rebanada(cubo, contenido="canal", por=("canal",)).copy()
+    base["periodo"] = base["periodo"].astype(str)
+    ancho = {
+        col: base.pivot(index="canal", columns="periodo", values=col).sort_index(axis=1)
+        for col in ["suscriptores", "vistas_totales", "delta_suscriptores", "delta_vistas", "nombre"]
+    }
+    presente = ancho["suscriptores"].notna().to_numpy()
+    partes = []
+
+    for medida, col_delta, bandera in [
+        ("suscriptores", "delta_suscriptores", "salto_suscriptores"),
+        ("vistas_totales", "delta_vistas", "salto_vistas"),
+    ]:
+        delta = ancho[col_delta].astype(float)
+        x = delta.to_numpy()
+        med_h, mad_h = historia_movil(x)
+        z_h = z_robusto(x, med_h, mad_h)
+
+        # Sin historia suficiente: crecimiento % contra los demás canales del mes
+        previo = ancho[medida].astype(float).to_numpy() - x
+        pct = np.where(previo > 0, 100 * x / previo, np.nan)
+        med_t, mad_t = transversal(pct)
+        z_t = z_robusto(pct, med_t, mad_t)
+
+        usa_historia = ~np.isnan(med_h)
+        z = np.where(usa_historia, z_h, z_t)
+        mascara = np.abs(z) > UMBRAL_Z
+        partes.append(_a_filas(
+            mascara, delta, bandera,
+            valor=np.where(usa_historia, x, pct),
+            referencia=np.where(usa_historia, med_h, med_t),
+            z=z,
+            metodo=np.where(usa_historia, "historia_canal", "crecimiento_%_vs_canales"),
+        ))
+
+    vistas = ancho["delta_vistas"].astype(float)
+    partes.append(_a_filas(vistas.to_numpy() < 0, vistas, "vistas_negativas",
+                           valor=vistas.to_numpy(), metodo="regla"))
+
+    # Presente el mes anterior (con algún reporte) y ausente en este
+    baja = np.zeros_like(presente)
+    baja[:, 1:] = presente[:, :-1] & ~presente[:, 1:]
+    partes.append(_a_filas(baja, ancho["suscriptores"], "baja", metodo="regla"))
+
+    nombres = ancho["nombre"].astype(object)
+    anterior = nombres.T.ffill().shift(1).T
+    cambio = (nombres.notna() & anterior.notna() & (nombres != anterior)).to_numpy()
+    partes.append(_a_filas(cambio, nombres, "cambio_nombre",
+                           valor=nombres.to_numpy(), referencia=anterior.to_numpy(), metodo="regla"))
+
+    flags = pd.concat([p for p in partes if not p.empty], ignore_index=True)
+    if flags.empty:
+        return pd.DataFrame(columns=COLUMNAS)
+    ultimo_nombre = nombres.T.ffill().T.iloc[:, -1]
+    flags["nombre"] = flags["canal"].map(ultimo_nombre)
+    return flags
+
+
+def leer_videos():
+    """Vistas por video de todos los meses: periodo, nivel, canal, nombre, video_id, vistas."""
+    partes = []
+    for periodo, f in fuentes_por_periodo().items():
+        for ruta in f["videos"]:
+            df = pd.read_csv(ruta, usecols=["channel_id", "channel_title", "video_id", "view_count"])
+            df.columns = ["canal", "nombre", "video_id", "vistas"]
+            partes.append(df.assign(periodo=periodo, nivel="video"))
+        if f["shorts"] is not None:
+            df = pd.read_csv(f["shorts"], usecols=["CanalID", "VideoID", "Vistas"])
+            df.columns = ["canal", "video_id", "vistas"]
+            partes.append(df.assign(periodo=periodo, nivel="short", nombre=None))
+    if not partes:
+        return pd.DataFrame(columns=["periodo", "nivel", "canal", "nombre", "video_id", "vistas"])
+    videos = pd.concat(partes, ignore_index=True).drop_duplicates(["periodo", "nivel", "video_id"])
+    videos["vistas"] = pd.to_numeric(videos["vistas"], errors="coerce")
+    return videos.dropna(subset=["vistas"])
+
+
+def anomalias_videos(videos):
+    """Videos con vistas atípicamente altas frente a los del mismo canal, nivel y mes."""
+    if videos.empty:
+        return pd.DataFrame(columns=COLUMNAS)
+    videos = videos.copy()
+    videos["log_vistas"] = np.log1p(videos["vistas"].clip(lower=0))
+    grupos = videos.groupby(["periodo", "nivel", "canal"])["log_vistas"]
+    mediana = grupos.transform("median")
+    videos["desvio"] = (videos["log_vistas"] - mediana).abs()
+    mad = videos.groupby(["periodo", "nivel", "canal"])["desvio"].transform("median")
+    # En escala log el piso de la MAD es fijo: equivale a ~±10 % de vistas
+    videos["z"] = K_MAD * (videos["log_vistas"] - mediana) / np.fmax(mad, 0.1)
+    videos["referencia"] = np.expm1(mediana)
+    marcados = videos[(grupos.transform("size") >= MIN_VIDEOS) & (videos["z"] > UMBRAL_Z)]
+    return marcados.assign(
+        bandera="vistas_" + marcados["nivel"],
+        valor=marcados["vistas"],
+        metodo="log_vistas_vs_canal_mes",
+    )
+
+
+def detectar_anomalias(cubo=None):
+    """Devuelve la tabla de banderas de canales y videos de todos los meses."""
+    if cubo is None:
+        cubo = construir_cubo()
+    flags = pd.concat(
+        [anomalias_canales(cubo), anomalias_videos(leer_videos())], ignore_index=True
+    ).reindex(columns=COLUMNAS)
+    nombres = (rebanada(cubo, contenido="canal", por=("canal",))
+               .sort_values("periodo").groupby("canal")["nombre"].last())
+    flags["nombre"] = flags["nombre"].fillna(flags["canal"].map(nombres))
+    flags["z"] = flags["z"].astype(float).round(2)
+    return flags.sort_values(["periodo", "nivel", "canal", "bandera", "video_id"]).reset_index(drop=True)
+
+
+def guardar_anomalias(flags, ruta=ANOMALIAS_FILE):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    flags.to_csv(ruta, index=False)
+
+
+def cargar_anomalias(ruta=ANOMALIAS_FILE):
+    if not ruta.exists():
+        return pd.DataFrame(columns=COLUMNAS)
+    return pd.read_csv(ruta, dtype={"periodo": str, "canal": str, "video_id": str})
+
+
+def banderas_por_canal(flags, periodo, nivel="canal"):
+    """{canal: "bandera1, bandera2"} para un periodo, útil para anotar rankings."""
+    sel = flags[(flags["periodo"] == periodo) & (flags["nivel"] == nivel)]
+    return sel.groupby("canal")["bandera"].agg(lambda b: ", ".join(sorted(set(b)))).to_dict()
+
+
+def main():
+    inst = iniciar_instrumentacion("anomalias")
+    with inst.etapa("carga"):
+        cubo = construir_cubo()
+    with inst.etapa("deteccion"):
+        flags = detectar_anomalias(cubo)
+    with inst.etapa("escritura"):
+        guardar_anomalias(flags)
+    resumen = flags.groupby(["periodo", "bandera"]).size().unstack(fill_value=0)
+    print(resumen.tail(3).to_string() if not resumen.empty else "Sin anomalías")
+    print(f"✅ {len(flags)} banderas guardadas en {ANOMALIAS_FILE.relative_to(RAIZ)}")
+
+
+if __name__ == "__main__":
+    main()
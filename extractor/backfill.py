@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Carga histórica de vivos y Shorts para canales recién agregados.
+
+youtube_report.py sólo mira los últimos 31 días y shorts_analysis.py los
+últimos 30, así que un canal nuevo entra al histórico sin pasado. Este script
+recorre la playlist de uploads de cada canal (playlistItems.list, 1 unidad por
+página de 50) desde el video más nuevo hacia atrás y corta apenas pasa la fecha
+de inicio; después pide los detalles en lotes de 50 (videos.list, 1 unidad).
+Los canales y los lotes se procesan en paralelo con un número acotado de hilos.
+
+Cada video se asigna al mes calendario en que se publicó y se escribe con la
+misma convención que una corrida mensual, que se etiqueta con el mes siguiente
+(los vivos de abril van en videos_05-2026.csv, los Shorts de abril en
+shorts_details_2026-05.csv):
+ - Vivos (tienen liveStreamingDetails.actualEndTime):
+   data/videos/canal_*/videos_MM-YYYY.csv/.xlsx y top10_videos_MM-YYYY.csv/.xlsx
+ - Shorts (< 4 minutos y no vivos):
+   data/shorts_stats/shorts_details_YYYY-MM.csv y shorts_summary_YYYY-MM.csv
+Los videos que ya están guardados (mismo video_id) no se duplican; si el canal ya
+tiene archivo para ese mes, se le agregan sólo los faltantes.
+
+Los reportes de canales (data/canales/report_*.csv) no se pueden reconstruir:
+la API sólo devuelve suscriptores y vistas totales actuales, no históricos.
+
+Uso:
+    python extractor/backfill.py --nuevos --desde 2025-07
+    python extractor/backfill.py --canales UCxxx,UCyyy --desde 2025-07 --hasta 2026-04 [--workers 8]
+"""
+
+import argparse
+import csv
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import requests
+from dotenv import load_dotenv
+from isodate import parse_duration
+
+from instrumentacion import iniciar_instrumentacion
+from muestreo_vivos import cargar_concurrencia, lotes, uploads_playlist
+from resolver_canales import resolver_canales
+from youtube_report import VivoRegistro, COLUMNAS_VIDEOS, enriquecer, escribir_vivos
+
+load_dotenv()
+API_KEY = os.getenv("YOUTUBE_API_KEY", "")
+YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
+CHANNELS_FILE = Path("extractor/channels.csv")
+CANALES_DIR = Path("data/canales")
+VIDEOS_DIR = Path("data/videos")
+SHORTS_DIR = Path("data/shorts_stats")
+DURACION_SHORT_SEG = 4 * 60  # mismo corte que videoDuration=short en shorts_analysis.py
+COLUMNAS_SHORTS = ["CanalID", "Nombre", "VideoID", "Titulo", "Fecha", "Vistas", "Likes", "Comentarios"]
+COLUMNAS_RESUMEN_SHORTS = ["CanalID", "Nombre", "CantidadShorts", "PrimerShort", "UltimoShort"]
+
+_local = threading.local()
+
+
+# ==== API (requests, una sesión por hilo) ====
+def api(recurso, **params):
+    if not hasattr(_local, "sesion"):
+        _local.sesion = requests.Session()
+    resp = _local.sesion.get(f"{YOUTUBE_API_URL}/{recurso}", params={"key": API_KEY, **params}, timeout=30)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def recorrer_uploads(channel_id, desde, hasta):
+    """IDs de uploads publicados en [desde, hasta); corta en la primera página que ya es más vieja que `desde`."""
+    ids, token = [], None
+    while True:
+        params = {"part": "contentDetails", "playlistId": uploads_playlist(channel_id), "maxResults": 50}
+        if token:
+            params["pageToken"] = token
+        data = api("playlistItems", **params)
+        fechas = []
+        for item in data.get("items", []):
+            det = item["contentDetails"]
+            fecha = det.get("videoPublishedAt", "")
+            fechas.append(fecha)
+            if desde <= fecha < hasta:
+                ids.append(det["videoId"])
+        token = data.get("nextPageToken")
+        if not token or (fechas and max(fechas) < desde):
+            return ids
+
+
+def pedir_detalles(ids):
+    return api("videos", id=",".join(ids), part="snippet,contentDetails,statistics,liveStreamingDetails").get("items", [])
+
+
+# ==== Meses ====
+def mes_siguiente(periodo):
+    anio, mes = map(int, periodo.split("-"))
+    return f"{anio + mes // 12}-{mes % 12 + 1:02d}"
+
+
+def etiqueta_vivos(periodo):
+    """Mes de publicación 2026-04 → etiqueta de archivo 05-2026."""
+    anio, mes = mes_siguiente(periodo).split("-")
+    return f"{mes}-{anio}"
+
+
+def etiqueta_shorts(periodo):
+    """Mes de publicación 2026-04 → etiqueta de archivo 2026-05."""
+    return mes_siguiente(periodo)
+
+
+def ultimo_mes_completo():
+    hoy = datetime.now(timezone.utc)
+    return f"{hoy.year - (hoy.month == 1)}-{(hoy.month - 2) % 12 + 1:02d}"
+
+
+# ==== Estado actual del histórico ====
+def leer_canales():
+    """Filas de channels.csv con channel_id resuelto (las que no se pueden resolver se avisan)."""
+    with open(CHANNELS_FILE, newline='', encoding='utf-8') as f:
+        return resolver_canales(csv.DictReader(f), API_KEY)
+
+
+def canales_en_reportes():
+    ids = set()
+    for ruta in CANALES_DIR.glob("report_*.csv"):
+        with open(ruta, newline='', encoding='utf-8') as f:
+            ids.update(fila["CanalID"] for fila in csv.DictReader(f))
+    return ids
+
+
+def archivos_de_vivos():
+    """{(channel_id, etiqueta): ruta}, {channel_id: carpeta} y el conjunto de video_id ya guardados."""
+    archivos, carpetas, guardados = {}, {}, set()
+    for ruta in VIDEOS_DIR.glob("canal_*/videos_*.csv"):
+        etiqueta = ruta.stem[len("videos_"):]
+        with open(ruta, newline='', encoding='utf-8') as f:
+            for fila in csv.DictReader(f):
+                archivos[(fila["channel_id"], etiqueta)] = ruta
+                carpetas[fila["channel_id"]] = ruta.parent
+                guardados.add(fila["video_id"])
+    return archivos, carpetas, guardados
+
+
+def shorts_guardados():
+    guardados = set()
+    for ruta in SHORTS_DIR.glob("shorts_details_*.csv"):
+        with open(ruta, newline='', encoding='utf-8') as f:
+            guardados.update(fila["VideoID"] for fila in csv.DictReader(f))
+    return guardados
+
+
+def registro_desde_fila(fila):
+    """Vuelve a armar un VivoRegistro desde una fila ya escrita, para reescribir el mes completo."""
+    datos = {col: fila.get(col) or None for col in COLUMNAS_VIDEOS}
+    for col in ["view_count", "like_count", "comment_count"]:
+        datos[col] = int(float(datos[col] or 0))
+    for col in ["description", "monetizacion", "platforms", "links", "notas"]:
+        datos[col] = datos[col] or ""
+    return VivoRegistro(**datos)
+
+
+# ==== Escritura ====
+def escribir_vivos_mes(channel_id, etiqueta, nuevos, archivos, carpetas, inst):
+    # Si el mes ya tiene archivo se reescribe en su misma carpeta (un canal puede tener a la vez
+    # canal_<Nombre>/ renombrada y canal_<id>/); si no, la que ya exista para el canal
+    existente = archivos.get((channel_id, etiqueta))
+    if existente:
+        directorio = existente.parent
+    else:
+        directorio = carpetas.get(channel_id, VIDEOS_DIR / f"canal_{channel_id}")
+    previos = []
+    if existente:
+        with open(existente, newline='', encoding='utf-8') as f:
+            previos = [registro_desde_fila(fila) for fila in csv.DictReader(f)]
+    registros = previos + sorted(nuevos, key=lambda r: r.published_at, reverse=True)
+    escribir_vivos(registros, directorio, etiqueta, inst)
+
+
+def escribir_shorts_mes(etiqueta, filas, nombre_por_canal):
+    detalles_ruta = SHORTS_DIR / f"shorts_details_{etiqueta}.csv"
+    resumen_ruta = SHORTS_DIR / f"shorts_summary_{etiqueta}.csv"
+    nuevos = pd.DataFrame(filas, columns=COLUMNAS_SHORTS)
+    previos = pd.read_csv(detalles_ruta, dtype=str, keep_default_na=False) if detalles_ruta.exists() else None
+    detalles = pd.concat([previos, nuevos.astype(str)], ignore_index=True)
+    detalles.to_csv(detalles_ruta, index=False)
+
+    # El resumen de los canales cargados se recalcula con todos sus Shorts del mes
+    resumen = detalles[detalles["CanalID"].isin(nuevos["CanalID"])].groupby("CanalID").agg(
+        CantidadShorts=("VideoID", "count"), PrimerShort=("Fecha", "min"), UltimoShort=("Fecha", "max")
+    ).reset_index()
+    resumen.insert(1, "Nombre", resumen["CanalID"].map(nombre_por_canal))
+    if resumen_ruta.exists():
+        previo = pd.read_csv(resumen_ruta, dtype=str, keep_default_na=False)
+        resumen = pd.concat([previo[~previo["CanalID"].isin(resumen["CanalID"])], resumen], ignore_index=True)
+    resumen[COLUMNAS_RESUMEN_SHORTS].to_csv(resumen_ruta, index=False)
+
+
+# ==== MAIN ====
+def main():
+    inst = iniciar_instrumentacion("backfill")
+    ap = argparse.ArgumentParser(description="Carga histórica de vivos y Shorts por mes calendario.")
+    grupo = ap.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--canales", help="channel_id separados por coma")
+    grupo.add_argument("--nuevos", action="store_true", help="canales de channels.csv que no figuran en ningún reporte")
+    ap.add_argument("--desde", required=True, help="primer mes de publicación (YYYY-MM)")
+    ap.add_argument("--hasta", default=ultimo_mes_completo(), help="último mes de publicación (YYYY-MM)")
+    ap.add_argument("--workers", type=int, default=6, help="hilos para llamadas a la API")
+    ap.add_argument("--solo", choices=["vivos", "shorts"], help="cargar sólo vivos o sólo Shorts")
+    args = ap.parse_args()
+
+    if not API_KEY:
+        raise SystemExit("❌ YOUTUBE_API_KEY no está configurada.")
+
+    canales = leer_canales()
+    if args.nuevos:
+        en_reportes = canales_en_reportes()
+        canales = [c for c in canales if c["channel_id"].strip() not in en_reportes]
+    else:
+        pedidos = {c.strip() for c in args.canales.split(",")}
+        canales = [c for c in canales if c["channel_id"] in pedidos] + resolver_canales([
+            {"channel_id": c, "channel_url": f"https://www.youtube.com/channel/{c}"}
+            for c in sorted(pedidos - {c["channel_id"] for c in canales})
+        ], API_KEY)
+    if not canales:
+        print("✅ No hay canales para cargar")
+        return
+    nombre_por_canal = {c["channel_id"]: c.get("titulo") or c.get("channel_url", "").strip() for c in canales}
+    desde = f"{args.desde}-01T00:00:00Z"
+    hasta = f"{mes_siguiente(args.hasta)}-01T00:00:00Z"  # exclusivo: fin del mes --hasta
+    print(f"📼 Backfill de {len(canales)} canales, publicados entre {args.desde} y {args.hasta}")
+
+    # 1) Uploads de cada canal en paralelo, con corte temprano por fecha
+    ids_por_canal = {}
+    with inst.etapa("recorrido"), ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futuros = {pool.submit(recorrer_uploads, cid, desde, hasta): cid for cid in nombre_por_canal}
+        for fut in as_completed(futuros):
+            cid = futuros[fut]
+            try:
+                ids_por_canal[cid] = fut.result()
+            except requests.RequestException as e:
+                print(f"❌ No se pudo recorrer uploads de {cid}: {e}")
+
+    # 2) Detalles en lotes de 50, también en paralelo
+    items = []
+    with inst.etapa("detalles"), ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futuros = [pool.submit(pedir_detalles, lote) for ids in ids_por_canal.values() for lote in lotes(ids)]
+        for fut in as_completed(futuros):
+            try:
+                items.extend(fut.result())
+            except requests.RequestException as e:
+                print(f"❌ Falló un lote de videos.list: {e}")
+
+    # 3) Clasificar por mes de publicación y descartar lo ya guardado
+    with inst.etapa("carga_existente"):
+        archivos, carpetas, vivos_guardados = archivos_de_vivos()
+        shorts_ya = shorts_guardados()
+    vivos = defaultdict(list)    # (channel_id, mes) → [item]
+    shorts = defaultdict(list)   # mes → [fila]
+    for d in items:
+        snip = d["snippet"]
+        mes = snip["publishedAt"][:7]
+        if not args.desde <= mes <= args.hasta:
+            continue
+        if d.get("liveStreamingDetails", {}).get("actualEndTime"):
+            if args.solo != "shorts" and d["id"] not in vivos_guardados:
+                vivos[(snip["channelId"], mes)].append(d)
+        elif parse_duration(d["contentDetails"].get("duration", "PT0S")).total_seconds() < DURACION_SHORT_SEG:
+            if args.solo != "vivos" and d["id"] not in shorts_ya:
+                stats = d.get("statistics", {})
+                shorts[mes].append({
+                    "CanalID": snip["channelId"],
+                    "Nombre": nombre_por_canal.get(snip["channelId"], ""),
+                    "VideoID": d["id"],
+                    "Titulo": snip["title"],
+                    "Fecha": snip["publishedAt"][:10],
+                    "Vistas": int(stats.get("viewCount", 0)),
+                    "Likes": int(stats.get("likeCount", 0)),
+                    "Comentarios": int(stats.get("commentCount", 0)),
+                })
+
+    # 4) Escribir con la misma estructura que una corrida mensual
+    concurrencia = cargar_concurrencia()
+    for (cid, mes), lote in sorted(vivos.items()):
+        etiqueta = etiqueta_vivos(mes)
+        nombre = lote[0]["snippet"].get("channelTitle", "")
+        escribir_vivos_mes(cid, etiqueta, list(enriquecer(lote, cid, nombre, etiqueta, concurrencia)), archivos, carpetas, inst)
+        print(f"📺 {nombre}: {len(lote)} vivos nuevos en videos_{etiqueta}")
+    with inst.etapa("escritura"):
+        for mes, filas in sorted(shorts.items()):
+            escribir_shorts_mes(etiqueta_shorts(mes), filas, nombre_por_canal)
+            print(f"⚡ {len(filas)} Shorts nuevos en shorts_details_{etiqueta_shorts(mes)}")
+    print(f"✅ Backfill terminado: {sum(map(len, vivos.values()))} vivos y {sum(map(len, shorts.values()))} Shorts")
+
+
+if __name__ == "__main__":
+    main()
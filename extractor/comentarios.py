@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Ingesta de comentarios de los vivos y Shorts de un mes, con resúmenes por video y por canal.
+
+Los videos salen de lo que ya está guardado para el período (data/videos/*/videos_MM-YYYY.csv
+y data/shorts_stats/shorts_details_YYYY-MM.csv); los que tienen comment_count 0 se saltean.
+Cada video se pagina con commentThreads.list (1 unidad por página de 100 hilos, con hasta
+5 respuestas incluidas) en un pool de hilos que comparte un presupuesto de unidades: cuando
+se agota, los videos en curso quedan incompletos y se retoman en la corrida siguiente.
+
+Cada página se agrega apenas llega a
+    data/comentarios/mes=YYYY-MM/canal=<channel_id>/<video_id>.jsonl.gz
+(un comentario por línea) sin acumular el video en memoria. Los comentarios se deduplican
+por ID contra lo ya guardado; como se pide order=time, un video que ya se completó una vez
+deja de paginar en la primera página sin hilos nuevos.
+
+Con todo lo guardado se arman, en la misma carpeta del mes:
+ - resumen_videos.csv: por video_id (se une a videos_*.csv por video_id y a
+   shorts_details_*.csv por VideoID) con hilos, respuestas, comentaristas únicos,
+   profundidad de respuestas y comentarios por hora dentro de la ventana del video
+   (el vivo: published_at + duration_sec; un Short: sus primeras 48 horas).
+ - resumen_canales.csv: por channel_id, con comentaristas únicos y recurrentes del mes.
+YouTube sólo anida un nivel de respuestas, así que la "profundidad" de un hilo es su
+cantidad de respuestas (totalReplyCount).
+
+Uso:
+    python extractor/comentarios.py [--mes 2026-05] [--presupuesto 3000] [--workers 6]
+                                    [--solo vivos|shorts] [--solo-resumen]
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+import requests
+from dotenv import load_dotenv
+
+from cubo_rollup import RAIZ, fuentes_por_periodo, periodo_de
+from instrumentacion import iniciar_instrumentacion
+
+load_dotenv()
+API_KEY = os.getenv("YOUTUBE_API_KEY", "")
+YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
+COMENTARIOS_DIR = RAIZ / "data" / "comentarios"
+PRESUPUESTO = 3000        # unidades de cuota por corrida
+HORAS_VENTANA_SHORT = 48
+COLUMNAS_RESUMEN_VIDEOS = [
+    "channel_id", "video_id", "tipo", "hilos", "respuestas", "comentarios", "respuestas_guardadas",
+    "comentaristas_unicos", "max_respuestas_hilo", "prom_respuestas_hilo", "pct_hilos_con_respuesta",
+    "likes_comentarios", "comentarios_en_ventana", "comentarios_por_hora", "estado",
+]
+COLUMNAS_RESUMEN_CANALES = [
+    "channel_id", "videos", "hilos", "respuestas", "comentarios", "comentaristas_unicos",
+    "comentaristas_recurrentes", "max_respuestas_hilo", "prom_respuestas_hilo", "comentarios_por_hora",
+]
+
+_local = threading.local()
+
+
+class Presupuesto:
+    """Unidades de cuota compartidas entre hilos."""
+
+    def __init__(self, unidades):
+        self.unidades = unidades
+        self.usadas = 0
+        self._lock = threading.Lock()
+
+    def consumir(self, costo=1):
+        with self._lock:
+            if self.usadas + costo > self.unidades:
+                return False
+            self.usadas += costo
+            return True
+
+
+# ==== API (requests, una sesión por hilo) ====
+def api(recurso, **params):
+    if not hasattr(_local, "sesion"):
+        _local.sesion = requests.Session()
+    resp = _local.sesion.get(f"{YOUTUBE_API_URL}/{recurso}", params={"key": API_KEY, **params}, timeout=30)
+    resp.raise_for_status()
+    return resp.json()
+
+
+# ==== Videos del período ====
+def _fecha(valor):
+    return datetime.fromisoformat(valor.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def videos_del_periodo(periodo, solo=None):
+    """
+    [{channel_id, video_id, tipo, inicio, fin, comentarios}] de los vivos y Shorts guardados para el período.
+    Los archivos mensuales pueden repetir un video: se queda la primera fila de cada video_id.
+    """
+    fuentes = fuentes_por_periodo().get(periodo, {"videos": [], "shorts": None})
+    videos = {}
+    if solo != "shorts":
+        for ruta in fuentes["videos"]:
+            with open(ruta, newline='', encoding='utf-8') as f:
+                for fila in csv.DictReader(f):
+                    inicio = _fecha(fila["published_at"])
+                    videos.setdefault(fila["video_id"], {
+                        "channel_id": fila["channel_id"], "video_id": fila["video_id"], "tipo": "vivo",
+                        "inicio": inicio, "fin": inicio + timedelta(seconds=float(fila["duration_sec"] or 0)),
+                        "comentarios": int(float(fila["comment_count"] or 0)),
+                    })
+    if solo != "vivos" and fuentes["shorts"]:
+        with open(fuentes["shorts"], newline='', encoding='utf-8') as f:
+            for fila in csv.DictReader(f):
+                inicio = _fecha(f"{fila['Fecha']}T00:00:00+00:00")
+                videos.setdefault(fila["VideoID"], {
+                    "channel_id": fila["CanalID"], "video_id": fila["VideoID"], "tipo": "short",
+                    "inicio": inicio, "fin": inicio + timedelta(hours=HORAS_VENTANA_SHORT),
+                    "comentarios": int(float(fila["Comentarios"] or 0)),
+                })
+    return list(videos.values())
+
+
+# ==== Almacenamiento ====
+def directorio_mes(periodo):
+    return COMENTARIOS_DIR / f"mes={periodo}"
+
+
+def ruta_video(periodo, video):
+    return directorio_mes(periodo) / f"canal={video['channel_id']}" / f"{video['video_id']}.jsonl.gz"
+
+
+def leer_comentarios(ruta):
+    if not ruta.exists():
+        return
+    with gzip.open(ruta, "rt", encoding="utf-8") as f:
+        for linea in f:
+            yield json.loads(linea)
+
+
+def cargar_estado(periodo):
+    ruta = directorio_mes(periodo) / "estado.json"
+    return json.loads(ruta.read_text(encoding="utf-8")) if ruta.exists() else {}
+
+
+def guardar_estado(periodo, estado):
+    ruta = directorio_mes(periodo) / "estado.json"
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(json.dumps(dict(sorted(estado.items())), indent=2), encoding="utf-8")
+
+
+def aplanar(hilo):
+    """Un hilo de commentThreads.list → el comentario principal y sus respuestas incluidas."""
+    principal = hilo["snippet"]["topLevelComment"]
+    yield _registro(principal, hilo["id"], None, hilo["snippet"].get("totalReplyCount", 0))
+    for respuesta in hilo.get("replies", {}).get("comments", []):
+        yield _registro(respuesta, hilo["id"], hilo["id"], None)
+
+
+def _registro(comentario, hilo_id, padre, respuestas):
+    s = comentario["snippet"]
+    return {
+        "id": comentario["id"],
+        "hilo": hilo_id,
+        "padre": padre,
+        "autor": s.get("authorDisplayName", ""),
+        "autor_canal": s.get("authorChannelId", {}).get("value"),
+        "texto": s.get("textDisplay", ""),
+        "likes": s.get("likeCount", 0),
+        "publicado": s.get("publishedAt", ""),
+        "respuestas": respuestas,
+    }
+
+
+# ==== Ingesta ====
+def ingerir_video(periodo, video, presupuesto, completo_antes):
+    """Pagina los hilos del video y agrega al .jsonl.gz los comentarios nuevos. Devuelve (nuevos, estado)."""
+    ruta = ruta_video(periodo, video)
+    conocidos = {c["id"] for c in leer_comentarios(ruta)}
+    nuevos, token = 0, None
+    while True:
+        if not presupuesto.consumir():
+            return nuevos, "incompleto"
+        params = {"part": "snippet,replies", "videoId": video["video_id"], "maxResults": 100,
+                  "order": "time", "textFormat": "plainText"}
+        if token:
+            params["pageToken"] = token
+        try:
+            data = api("commentThreads", **params)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in (403, 404) and \
+                    ("commentsDisabled" in e.response.text or "videoNotFound" in e.response.text):
+                return nuevos, "deshabilitado"
+            raise
+
+        lineas, hilos_nuevos = [], 0
+        for hilo in data.get("items", []):
+            hilos_nuevos += hilo["id"] not in conocidos
+            for registro in aplanar(hilo):
+                if registro["id"] not in conocidos:
+                    conocidos.add(registro["id"])
+                    lineas.append(json.dumps(registro, ensure_ascii=False))
+        if lineas:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(ruta, "at", encoding="utf-8") as f:
+                f.write("\n".join(lineas) + "\n")
+            nuevos += len(lineas)
+
+        token = data.get("nextPageToken")
+        # order=time: si el video ya se bajó completo, lo que sigue ya está guardado
+        if not token or (completo_antes and not hilos_nuevos):
+            return nuevos, "completo"
+
+
+def ingerir(periodo, videos, presupuesto, workers, inst):
+    estado = cargar_estado(periodo)
+    pendientes = [v for v in videos if v["comentarios"] > 0 and estado.get(v["video_id"]) != "deshabilitado"]
+    total = 0
+    try:
+        with inst.etapa("ingesta"), ThreadPoolExecutor(max_workers=workers) as pool:
+            futuros = {
+                pool.submit(ingerir_video, periodo, v, presupuesto, estado.get(v["video_id"]) == "completo"): v
+                for v in pendientes
+            }
+            for fut in as_completed(futuros):
+                video = futuros[fut]
+                try:
+                    nuevos, resultado = fut.result()
+                except requests.RequestException as e:
+                    print(f"❌ Falló commentThreads de {video['video_id']}: {e}")
+                    continue
+                total += nuevos
+                # Un video que ya estuvo completo sigue contando como tal aunque se corte la actualización
+                if resultado != "incompleto" or estado.get(video["video_id"]) != "completo":
+                    estado[video["video_id"]] = resultado
+    finally:
+        # Lo ya agregado a los .jsonl.gz queda en disco: el estado se guarda aunque la corrida se corte
+        guardar_estado(periodo, estado)
+    incompletos = sum(estado.get(v["video_id"]) == "incompleto" for v in pendientes)
+    print(f"💬 {total} comentarios nuevos en {len(pendientes)} videos "
+          f"({presupuesto.usadas}/{presupuesto.unidades} unidades, {incompletos} incompletos)")
+    return estado
+
+
+# ==== Resúmenes ====
+def resumir_video(periodo, video, estado):
+    """Recorre el .jsonl.gz del video una vez. Devuelve (fila del resumen, conjunto de comentaristas)."""
+    hilos = respuestas = guardadas = likes = en_ventana = max_resp = con_resp = 0
+    autores = set()
+    for c in leer_comentarios(ruta_video(periodo, video)):
+        autores.add(c["autor_canal"] or c["autor"])
+        likes += c["likes"] or 0
+        if c["publicado"] and video["inicio"] <= _fecha(c["publicado"]) <= video["fin"]:
+            en_ventana += 1
+        if c["padre"] is None:
+            hilos += 1
+            n = c["respuestas"] or 0
+            respuestas += n
+            max_resp = max(max_resp, n)
+            con_resp += n > 0
+        else:
+            guardadas += 1
+    horas = max((video["fin"] - video["inicio"]).total_seconds() / 3600, 1 / 60)
+    fila = {
+        "channel_id": video["channel_id"],
+        "video_id": video["video_id"],
+        "tipo": video["tipo"],
+        "hilos": hilos,
+        "respuestas": respuestas,
+        "comentarios": hilos + respuestas,
+        "respuestas_guardadas": guardadas,
+        "comentaristas_unicos": len(autores),
+        "max_respuestas_hilo": max_resp,
+        "prom_respuestas_hilo": round(respuestas / hilos, 2) if hilos else 0,
+        "pct_hilos_con_respuesta": round(100 * con_resp / hilos, 1) if hilos else 0,
+        "likes_comentarios": likes,
+        "comentarios_en_ventana": en_ventana,
+        "comentarios_por_hora": round(en_ventana / horas, 2),
+        "estado": estado.get(video["video_id"], "sin_comentarios" if not video["comentarios"] else "pendiente"),
+    }
+    return fila, autores
+
+
+def _escribir_csv(ruta, columnas, filas):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta, "w", newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columnas)
+        writer.writeheader()
+        writer.writerows(filas)
+
+
+def resumir(periodo, videos, estado, inst):
+    filas_videos = []
+    por_canal = defaultdict(lambda: {"filas": [], "autores": defaultdict(int)})
+    with inst.etapa("resumen"):
+        for video in videos:
+            fila, autores = resumir_video(periodo, video, estado)
+            filas_videos.append(fila)
+            canal = por_canal[video["channel_id"]]
+            canal["filas"].append(fila)
+            for autor in autores:
+                canal["autores"][autor] += 1
+
+        filas_canales = []
+        for channel_id, canal in por_canal.items():
+            filas = canal["filas"]
+            hilos = sum(f["hilos"] for f in filas)
+            respuestas = sum(f["respuestas"] for f in filas)
+            filas_canales.append({
+                "channel_id": channel_id,
+                "videos": len(filas),
+                "hilos": hilos,
+                "respuestas": respuestas,
+                "comentarios": hilos + respuestas,
+                "comentaristas_unicos": len(canal["autores"]),
+                "comentaristas_recurrentes": sum(n > 1 for n in canal["autores"].values()),
+                "max_respuestas_hilo": max(f["max_respuestas_hilo"] for f in filas),
+                "prom_respuestas_hilo": round(respuestas / hilos, 2) if hilos else 0,
+                "comentarios_por_hora": round(sum(f["comentarios_por_hora"] for f in filas) / len(filas), 2),
+            })
+
+    directorio = directorio_mes(periodo)
+    _escribir_csv(directorio / "resumen_videos.csv", COLUMNAS_RESUMEN_VIDEOS, filas_videos)
+    _escribir_csv(directorio / "resumen_canales.csv", COLUMNAS_RESUMEN_CANALES,
+                  sorted(filas_canales, key=lambda f: f["comentarios"], reverse=True))
+    print(f"📊 Resúmenes en {directorio}: {len(filas_videos)} videos, {len(filas_canales)} canales")
+
+
+# ==== MAIN ====
+def main():
+    inst = iniciar_instrumentacion("comentarios")
+    ap = argparse.ArgumentParser(description="Ingesta de comentarios y resúmenes de engagement por video y canal.")
+    ap.add_argument("--mes", help="período de los archivos a procesar (YYYY-MM o MM-YYYY); por defecto el último")
+    ap.add_argument("--presupuesto", type=int, default=PRESUPUESTO, help="unidades de cuota máximas para la corrida")
+    ap.add_argument("--workers", type=int, default=6, help="hilos para llamadas a la API")
+    ap.add_argument("--solo", choices=["vivos", "shorts"], help="bajar comentarios sólo de vivos o sólo de Shorts")
+    ap.add_argument("--solo-resumen", action="store_true", help="no llamar a la API, sólo rehacer los resúmenes")
+    args = ap.parse_args()
+
+    periodos = list(fuentes_por_periodo())
+    periodo = periodo_de(args.mes) if args.mes else (periodos[-1] if periodos else None)
+    if not periodo:
+        raise SystemExit("❌ No hay datos de videos para elegir un período.")
+    # --solo limita sólo la ingesta: los resúmenes siempre cubren vivos y Shorts del mes
+    videos = videos_del_periodo(periodo)
+    a_ingerir = videos_del_periodo(periodo, args.solo) if args.solo else videos
+    print(f"💬 Período {periodo}: {len(a_ingerir)} videos")
+
+    if args.solo_resumen:
+        estado = cargar_estado(periodo)
+    else:
+        if not API_KEY:
+            raise SystemExit("❌ YOUTUBE_API_KEY no está configurada.")
+        estado = ingerir(periodo, a_ingerir, Presupuesto(args.presupuesto), args.workers, inst)
+    resumir(periodo, videos, estado, inst)
+
+
+if __name__ == "__main__":
+    main()
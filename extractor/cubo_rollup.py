@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Cubo de agregados precalculados: canal × mes × provincia × tipo × contenido.
+
+Lee los reportes mensuales (data/canales/report_MM-YYYY.csv), los vivos
+(data/videos/canal_*/videos_MM-YYYY.csv), los Shorts
+(data/shorts_stats/shorts_details_YYYY-MM.csv) y las dimensiones de
+extractor/channels.csv, y materializa en data/cubo/cubo_YYYY-MM.csv.gz
+una partición por mes con:
+
+ - Filas base por canal para cada contenido:
+     • vivos / shorts: items, vistas, likes, comentarios.
+     • canal: delta_vistas y delta_suscriptores contra el reporte anterior,
+       más las fotos suscriptores / vistas_totales (sumables entre canales,
+       no entre meses).
+ - Filas agregadas con canal = "*" para mes × contenido, por provincia,
+   por tipo y por provincia × tipo ("*" = todos).
+
+El periodo es la etiqueta del archivo de origen en formato YYYY-MM (ordenable).
+Sólo se reconstruyen los meses cuyas fuentes cambiaron (manifiesto.json guarda
+una huella de cada una), así que sumar un mes nuevo cuesta una sola partición.
+
+Uso:
+    python extractor/cubo_rollup.py [--forzar]
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import pandas as pd
+
+from instrumentacion import iniciar_instrumentacion
+
+# Rutas relativas a la raíz del repo, para poder importarlo desde cualquier script
+RAIZ = Path(__file__).resolve().parent.parent
+CHANNELS_FILE = RAIZ / "extractor" / "channels.csv"
+CANALES_DIR = RAIZ / "data" / "canales"
+VIDEOS_DIR = RAIZ / "data" / "videos"
+SHORTS_DIR = RAIZ / "data" / "shorts_stats"
+CUBO_DIR = RAIZ / "data" / "cubo"
+MANIFIESTO = CUBO_DIR / "manifiesto.json"
+
+TODOS = "*"
+DIMENSIONES = ["canal", "provincia", "tipo"]
+MEDIDAS = [
+    "items", "vistas", "likes", "comentarios", "delta_vistas",
+    "delta_suscriptores", "suscriptores", "vistas_totales", "canales"
+]
+COLUMNAS = ["periodo", "contenido", "canal", "nombre", "provincia", "tipo"] + MEDIDAS
+AGRUPACIONES = [[], ["provincia"], ["tipo"], ["provincia", "tipo"]]
+
+
+def periodo_de(nombre_archivo):
+    """report_05-2026 / videos_05-2026 / shorts_details_2026-05 → 2026-05."""
+    m = re.search(r"(\d{2})-(\d{4})$", nombre_archivo)
+    if m:
+        return f"{m.group(2)}-{m.group(1)}"
+    m = re.search(r"(\d{4})-(\d{2})$", nombre_archivo)
+    return f"{m.group(1)}-{m.group(2)}" if m else None
+
+
+def mes_anio(periodo):
+    """2026-05 → 05-2026, el formato de data/canales y data/videos."""
+    anio, mes = periodo.split("-")
+    return f"{mes}-{anio}"
+
+
+# ==== Fuentes ====
+def fuentes_por_periodo():
+    """Devuelve {periodo: {"reporte": Path|None, "videos": [Path], "shorts": Path|None}}."""
+    fuentes = {}
+
+    def entrada(periodo):
+        return fuentes.setdefault(periodo, {"reporte": None, "videos": [], "shorts": None})
+
+    for archivo in CANALES_DIR.glob("report_*.csv"):
+        entrada(periodo_de(archivo.stem))["reporte"] = archivo
+    for archivo in VIDEOS_DIR.glob("canal_*/videos_*.csv"):
+        entrada(periodo_de(archivo.stem))["videos"].append(archivo)
+    for archivo in SHORTS_DIR.glob("shorts_details_*.csv"):
+        entrada(periodo_de(archivo.stem))["shorts"] = archivo
+    fuentes.pop(None, None)
+    return dict(sorted(fuentes.items()))
+
+
+def huella(archivos):
+    h = hashlib.sha1()
+    for archivo in sorted(Path(a) for a in archivos if a):
+        h.update(archivo.relative_to(RAIZ).as_posix().encode())
+        h.update(archivo.read_bytes())
+    return h.hexdigest()
+
+
+def leer_reporte(ruta):
+    if ruta is None:
+        return pd.DataFrame(columns=["CanalID", "Nombre", "Suscriptores", "VistasTotales"])
+    df = pd.read_csv(ruta, usecols=["CanalID", "Nombre", "Suscriptores", "VistasTotales"])
+    for col in ["Suscriptores", "VistasTotales"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["Nombre"] = df["Nombre"].astype(str).str.strip()
+    return df.drop_duplicates("CanalID")
+
+
+# ==== Construcción ====
+def filas_canal(reporte, reporte_previo):
+    df = reporte.merge(
+        reporte_previo[["CanalID", "Suscriptores", "VistasTotales"]],
+        on="CanalID", how="left", suffixes=("", "_prev")
+    )
+    return pd.DataFrame({
+        "contenido": "canal",
+        "canal": df["CanalID"],
+        "nombre": df["Nombre"],
+        "delta_vistas": df["VistasTotales"] - df["VistasTotales_prev"],
+        "delta_suscriptores": df["Suscriptores"] - df["Suscriptores_prev"],
+        "suscriptores": df["Suscriptores"],
+        "vistas_totales": df["VistasTotales"],
+        "canales": 1,
+    })
+
+
+def filas_contenido(df, contenido, col_canal, col_video, col_vistas, col_likes, col_coment):
+    if df.empty:
+        return pd.DataFrame()
+    df = df.drop_duplicates(col_video)
+    for col in [col_vistas, col_likes, col_coment]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    agg = df.groupby(col_canal).agg(
+        items=(col_video, "count"),
+        vistas=(col_vistas, "sum"),
+        likes=(col_likes, "sum"),
+        comentarios=(col_coment, "sum"),
+    ).reset_index().rename(columns={col_canal: "canal"})
+    agg["contenido"] = contenido
+    agg["canales"] = 1
+    return agg
+
+
+def construir_particion(periodo, fuentes, reporte_previo, dims):
+    reporte = leer_reporte(fuentes["reporte"])
+    partes = [filas_canal(reporte, reporte_previo)] if not reporte.empty else []
+
+    if fuentes["videos"]:
+        videos = pd.concat(
+            [pd.read_csv(f, usecols=["channel_id", "video_id", "view_count", "like_count", "comment_count"])
+             for f in fuentes["videos"]],
+            ignore_index=True
+        )
+        partes.append(filas_contenido(videos, "vivos", "channel_id", "video_id",
+                                      "view_count", "like_count", "comment_count"))
+    if fuentes["shorts"]:
+        shorts = pd.read_csv(fuentes["shorts"])
+        if not shorts.empty:
+            partes.append(filas_contenido(shorts, "shorts", "CanalID", "VideoID",
+                                          "Vistas", "Likes", "Comentarios"))
+
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS)
+    base = pd.concat(partes, ignore_index=True)
+    if "nombre" not in base:
+        base["nombre"] = None
+    nombres = reporte.set_index("CanalID")["Nombre"]
+    base["nombre"] = base["nombre"].fillna(base["canal"].map(nombres)).fillna(base["canal"])
+    base["provincia"] = base["canal"].map(dims["provincia"]).fillna("Sin dato")
+    base["tipo"] = base["canal"].map(dims["tipo"]).fillna("Sin dato")
+    base["periodo"] = periodo
+    for col in MEDIDAS:
+        if col not in base:
+            base[col] = 0
+    base[["items", "vistas", "likes", "comentarios", "canales"]] = (
+        base[["items", "vistas", "likes", "comentarios", "canales"]].fillna(0).astype("int64")
+    )
+
+    # Agregados: canal = "*" y las dimensiones que no se agrupan también en "*"
+    rollups = []
+    for grupo in AGRUPACIONES:
+        claves = ["periodo", "contenido"] + grupo
+        agg = base.groupby(claves, as_index=False)[MEDIDAS].sum(min_count=1)
+        for dim in DIMENSIONES + ["nombre"]:
+            if dim not in grupo:
+                agg[dim] = TODOS
+        rollups.append(agg)
+    cubo = pd.concat([base] + rollups, ignore_index=True)[COLUMNAS]
+    return cubo.sort_values(["contenido", "canal", "provincia", "tipo"]).reset_index(drop=True)
+
+
+def ruta_particion(periodo):
+    return CUBO_DIR / f"cubo_{periodo}.csv.gz"
+
+
+def construir_cubo(forzar=False):
+    """Reconstruye las particiones cuyas fuentes cambiaron y devuelve el cubo completo."""
+    CUBO_DIR.mkdir(parents=True, exist_ok=True)
+    manifiesto = json.loads(MANIFIESTO.read_text(encoding="utf-8")) if MANIFIESTO.exists() else {}
+    dims = pd.read_csv(CHANNELS_FILE, dtype=str).drop_duplicates("channel_id").set_index("channel_id")
+
+    fuentes = fuentes_por_periodo()
+    reporte_previo_ruta = None
+    actualizados = []
+    for periodo, f in fuentes.items():
+        h = huella([f["reporte"], reporte_previo_ruta, f["shorts"], CHANNELS_FILE] + f["videos"])
+        if forzar or manifiesto.get(periodo) != h or not ruta_particion(periodo).exists():
+            cubo = construir_particion(periodo, f, leer_reporte(reporte_previo_ruta), dims)
+            cubo.to_csv(ruta_particion(periodo), index=False,
+                        compression={"method": "gzip", "mtime": 0})
+            manifiesto[periodo] = h
+            actualizados.append(periodo)
+        if f["reporte"] is not None:
+            reporte_previo_ruta = f["reporte"]
+
+    MANIFIESTO.write_text(json.dumps(manifiesto, indent=2, sort_keys=True), encoding="utf-8")
+    if actualizados:
+        print(f"🧊 Particiones del cubo actualizadas: {', '.join(actualizados)}")
+    return cargar_cubo()
+
+
+def cargar_cubo(periodos=None):
+    archivos = sorted(CUBO_DIR.glob("cubo_*.csv.gz"))
+    if periodos is not None:
+        archivos = [a for a in archivos if periodo_de(a.name[:-len(".csv.gz")]) in set(periodos)]
+    if not archivos:
+        return pd.DataFrame(columns=COLUMNAS)
+    df = pd.concat([pd.read_csv(a, dtype={"canal": str, "nombre": str}) for a in archivos],
+                   ignore_index=True)
+    for col in ["periodo", "contenido", "provincia", "tipo"]:
+        df[col] = df[col].astype("category")
+    return df
+
+
+def rebanada(cubo, por=(), **filtros):
+    """
+    Devuelve las filas del cubo para un corte dado.
+
+    Las dimensiones de `por` se devuelven desglosadas; las que aparecen en
+    `filtros` se fijan a ese valor; el resto queda agregado ("*"). `periodo` y
+    `contenido` se filtran sólo si se indican.
+        rebanada(cubo, contenido="vivos", periodo="2026-05", por=("provincia",))
+        rebanada(cubo, contenido="canal", por=("canal",), tipo="nativo")
+    """
+    mascara = pd.Series(True, index=cubo.index)
+    for col in ["periodo", "contenido"]:
+        if col in filtros:
+            mascara &= cubo[col] == filtros[col]
+    por_canal = "canal" in por or "canal" in filtros
+    for dim in DIMENSIONES:
+        if dim in filtros:
+            mascara &= cubo[dim] == filtros[dim]
+        elif dim in por:
+            mascara &= cubo[dim] != TODOS
+        elif not por_canal:
+            # provincia y tipo dependen del canal: sólo se fijan en "*" si no se desglosa por canal
+            mascara &= cubo[dim] == TODOS
+    return cubo[mascara]
+
+
+def main():
+    inst = iniciar_instrumentacion("cubo_rollup")
+    ap = argparse.ArgumentParser(description="Materializa el cubo de agregados mensuales.")
+    ap.add_argument("--forzar", action="store_true", help="reconstruir todas las particiones")
+    args = ap.parse_args()
+    with inst.etapa("construccion"):
+        cubo = construir_cubo(forzar=args.forzar)
+    print(f"✅ Cubo con {len(cubo)} filas y {cubo['periodo'].nunique()} periodos en {CUBO_DIR.relative_to(RAIZ)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,29 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
-import glob
-import re
-from datetime import datetime
+
+from cubo_rollup import construir_cubo, rebanada
+from instrumentacion import iniciar_instrumentacion
 
 # 1. Configuración de rutas
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-# '..' sube un nivel para salir de /extractor y entrar a /data/canales
-RUTAS_REPORTES = os.path.join(BASE_DIR, '..', 'data', 'canales', 'report_*.csv')
 ARCHIVO_SALIDA_GRAFICO = os.path.join(BASE_DIR, '..', 'grafico_ecosistema_mendoza.png')
 
-def extraer_fecha(nombre_archivo):
-    # Busca el formato report_MM-YYYY.csv
-    match = re.search(r'report_(\d{2})-(\d{4})', nombre_archivo)
-    if match:
-        return datetime.strptime(f"{match.group(1)}-{match.group(2)}", "%m-%Y")
-    return None
-
 def procesar_datos():
-    archivos = glob.glob(RUTAS_REPORTES)
-    if not archivos:
-        print(f"No se encontraron archivos en: {RUTAS_REPORTES}")
+    # Totales mensuales del ecosistema: una fila por periodo en el cubo de agregados
+    totales = rebanada(construir_cubo(), contenido="canal")
+    if totales.empty:
+        print("No se encontraron reportes mensuales en data/canales")
         return pd.DataFrame()
 
-    datos_mensuales = []
-    for archivo in archivos:
-        fecha = extraer_fecha(archivo)
-        if fecha:
-            try:
-                df = pd.read_csv(archivo)
-                if 'VistasTotales' in df.columns:
-                    datos_mensuales.append({
-                        'fecha': fecha,
-                        'vistas_acumuladas': df['VistasTotales'].sum(),
-                        'cantidad_canales': len(df)
-                    })
-            except Exception as e:
-                print(f"Error en {archivo}: {e}")
+    df_final = pd.DataFrame({
+        'fecha': pd.to_datetime(totales['periodo'].astype(str), format='%Y-%m').values,
+        'vistas_acumuladas': totales['vistas_totales'].values,
+        'cantidad_canales': totales['canales'].values
+    })
 
     # Ordenamos por fecha para que el cálculo de diferencia sea correcto
-    df_final = pd.DataFrame(datos_mensuales).sort_values('fecha')
+    df_final = df_final.sort_values('fecha').reset_index(drop=True)
     
     if len(df_final) > 1:
         # CALCULAMOS DIFERENCIAS (Aquí Agosto usa a Julio para compararse)
@@ -107,8 +90,11 @@ def generar_visualizacion(df):
     print(f"Éxito: Gráfico guardado en {ARCHIVO_SALIDA_GRAFICO}")
 
 if __name__ == "__main__":
-    df_procesado = procesar_datos()
+    inst = iniciar_instrumentacion("generar_grafico")
+    with inst.etapa("carga"):
+        df_procesado = procesar_datos()
     if not df_procesado.empty:
-        generar_visualizacion(df_procesado)
+        with inst.etapa("graficos"):
+            generar_visualizacion(df_procesado)
     else:
         print("Error: No hay datos suficientes para graficar.")
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Índice invertido de texto sobre títulos y descripciones de vivos y Shorts.
+
+Indexa el título y la descripción de cada vivo (data/videos/canal_*/videos_*.csv)
+y el título de cada Short (data/shorts_stats/shorts_details_*.csv) en
+data/indice/indice_texto.json.gz, con posiciones para poder buscar frases.
+
+Normalización: minúsculas, sin tildes ni diéresis (la ñ se conserva),
+sin stopwords del español y sin tokens de una sola letra.
+
+El índice es incremental: guarda la huella de cada archivo fuente y al
+reconstruir sólo quita y vuelve a agregar los documentos de los archivos que
+cambiaron o son nuevos.
+
+Uso:
+    python extractor/indice_texto.py construir
+    python extractor/indice_texto.py buscar 'vendimia "fiesta nacional" mal*' [--por canal-mes]
+
+Sintaxis de búsqueda: los términos se combinan con AND; "entre comillas" busca
+la frase exacta; termino* busca por prefijo.
+"""
+
+import argparse
+import bisect
+import csv
+import gzip
+import hashlib
+import json
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from cubo_rollup import periodo_de
+from instrumentacion import iniciar_instrumentacion
+
+csv.field_size_limit(sys.maxsize)
+
+RAIZ = Path(__file__).resolve().parent.parent
+VIDEOS_DIR = RAIZ / "data" / "videos"
+SHORTS_DIR = RAIZ / "data" / "shorts_stats"
+INDICE_FILE = RAIZ / "data" / "indice" / "indice_texto.json.gz"
+
+# Separación de posiciones entre título y descripción: evita frases que crucen campos
+SALTO_CAMPO = 100_000
+
+STOPWORDS = set("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde
+durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estas este
+esto estos fue fueron ha hay la las le les lo los mas me mi mis mucho muy nada ni no
+nos o os otra otro para pero poco por porque que quien se sea ser si sin sobre son
+su sus tambien te ti tu tus un una uno unos unas y ya yo
+""".split())
+
+TOKEN_RE = re.compile(r"[0-9a-zñ]+")
+
+
+def normalizar(texto):
+    """Minúsculas y plegado de acentos conservando la ñ."""
+    texto = texto.lower().replace("ñ", "\0")
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return texto.replace("\0", "ñ")
+
+
+def tokenizar(texto, desde=0):
+    """Devuelve [(posición, término)]; las posiciones cuentan también las stopwords."""
+    tokens = []
+    for i, tok in enumerate(TOKEN_RE.findall(normalizar(texto or ""))):
+        if len(tok) > 1 and tok not in STOPWORDS:
+            tokens.append((desde + i, tok))
+    return tokens
+
+
+def huella(ruta):
+    return hashlib.sha1(ruta.read_bytes()).hexdigest()
+
+
+def leer_documentos(ruta):
+    """Genera (video_id, canal, nombre_canal, tipo, titulo, descripcion) de un archivo fuente."""
+    with open(ruta, newline="", encoding="utf-8") as f:
+        for fila in csv.DictReader(f):
+            if "video_id" in fila:
+                yield (fila["video_id"], fila["channel_id"], fila.get("channel_title", ""),
+                       "vivo", fila.get("title", ""), fila.get("description", ""))
+            else:
+                # En los Shorts "Nombre" suele ser la URL del canal: sólo sirve si es un nombre
+                nombre = fila.get("Nombre", "")
+                yield (fila["VideoID"], fila["CanalID"], "" if nombre.startswith("http") else nombre,
+                       "short", fila.get("Titulo", ""), "")
+
+
+class Indice:
+    def __init__(self):
+        self.docs = []          # doc_id → [video_id, canal, periodo, tipo, titulo] | None
+        self.postings = {}      # término → {doc_id: [posiciones]}
+        self.fuentes = {}       # ruta relativa → {"huella": str, "docs": [doc_id]}
+        self.canales = {}       # canal → nombre
+        self._vocabulario = None
+
+    # ==== Persistencia ====
+    @classmethod
+    def cargar(cls, ruta=INDICE_FILE):
+        indice = cls()
+        if ruta.exists():
+            with gzip.open(ruta, "rt", encoding="utf-8") as f:
+                datos = json.load(f)
+            indice.docs = datos["docs"]
+            indice.fuentes = datos["fuentes"]
+            indice.canales = datos["canales"]
+            indice.postings = {
+                t: {int(d): pos for d, pos in docs} for t, docs in datos["postings"].items()
+            }
+        return indice
+
+    def compactar(self):
+        """Quita los huecos que dejan las fuentes reindexadas y renumera los doc_id."""
+        if None not in self.docs:
+            return
+        nuevo = {}
+        docs = []
+        for doc_id, doc in enumerate(self.docs):
+            if doc is not None:
+                nuevo[doc_id] = len(docs)
+                docs.append(doc)
+        self.docs = docs
+        self.postings = {t: {nuevo[d]: pos for d, pos in ds.items()} for t, ds in self.postings.items()}
+        for fuente in self.fuentes.values():
+            fuente["docs"] = [nuevo[d] for d in fuente["docs"]]
+
+    def guardar(self, ruta=INDICE_FILE):
+        self.compactar()
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        datos = {
+            "docs": self.docs,
+            "fuentes": self.fuentes,
+            "canales": self.canales,
+            "postings": {t: sorted(docs.items()) for t, docs in sorted(self.postings.items())},
+        }
+        tmp = ruta.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, separators=(",", ":"))
+        tmp.replace(ruta)
+
+    # ==== Actualización ====
+    def quitar_fuente(self, clave):
+        fuente = self.fuentes.pop(clave, None)
+        if not fuente:
+            return
+        quitados = set(fuente["docs"])
+        for doc_id in quitados:
+            self.docs[doc_id] = None
+        for termino in list(self.postings):
+            docs = self.postings[termino]
+            for doc_id in quitados.intersection(docs):
+                del docs[doc_id]
+            if not docs:
+                del self.postings[termino]
+
+    def agregar_fuente(self, ruta):
+        clave = ruta.relative_to(RAIZ).as_posix()
+        periodo = periodo_de(ruta.stem)
+        ids = []
+        for video_id, canal, nombre, tipo, titulo, descripcion in leer_documentos(ruta):
+            doc_id = len(self.docs)
+            self.docs.append([video_id, canal, periodo, tipo, titulo])
+            if nombre:
+                self.canales[canal] = nombre.strip()
+            ids.append(doc_id)
+            posiciones = {}
+            for pos, termino in tokenizar(titulo) + tokenizar(descripcion, SALTO_CAMPO):
+                posiciones.setdefault(termino, []).append(pos)
+            for termino, pos in posiciones.items():
+                self.postings.setdefault(termino, {})[doc_id] = pos
+        self.fuentes[clave] = {"huella": huella(ruta), "docs": ids}
+
+    def actualizar(self):
+        """Reindexa sólo los archivos nuevos o modificados; devuelve cuántos procesó."""
+        archivos = sorted(VIDEOS_DIR.glob("canal_*/videos_*.csv")) + sorted(SHORTS_DIR.glob("shorts_details_*.csv"))
+        vigentes = {a.relative_to(RAIZ).as_posix(): a for a in archivos}
+        cambios = 0
+        for clave in set(self.fuentes) - set(vigentes):
+            self.quitar_fuente(clave)
+            cambios += 1
+        for clave, ruta in vigentes.items():
+            fuente = self.fuentes.get(clave)
+            if fuente and fuente["huella"] == huella(ruta):
+                continue
+            self.quitar_fuente(clave)
+            self.agregar_fuente(ruta)
+            cambios += 1
+        self._vocabulario = None
+        return cambios
+
+    # ==== Consulta ====
+    def vocabulario(self):
+        if self._vocabulario is None:
+            self._vocabulario = sorted(self.postings)
+        return self._vocabulario
+
+    def docs_prefijo(self, prefijo):
+        voc = self.vocabulario()
+        docs = set()
+        i = bisect.bisect_left(voc, prefijo)
+        while i < len(voc) and voc[i].startswith(prefijo):
+            docs.update(self.postings[voc[i]])
+            i += 1
+        return docs
+
+    def docs_frase(self, frase):
+        tokens = tokenizar(frase)
+        if not tokens:
+            return set()
+        base_pos, base = tokens[0]
+        candidatos = set(self.postings.get(base, {}))
+        for _, termino in tokens[1:]:
+            candidatos &= set(self.postings.get(termino, {}))
+        resultado = set()
+        for doc_id in candidatos:
+            inicio = self.postings[base][doc_id]
+            otros = [(pos - base_pos, set(self.postings[t][doc_id])) for pos, t in tokens[1:]]
+            if any(all(p + offset in posiciones for offset, posiciones in otros) for p in inicio):
+                resultado.add(doc_id)
+        return resultado
+
+    def buscar(self, consulta):
+        """Devuelve los doc_id que cumplen todas las partes de la consulta."""
+        partes = re.findall(r'"([^"]+)"|(\S+)', consulta)
+        resultado = None
+        for frase, palabra in partes:
+            if frase:
+                docs = self.docs_frase(frase)
+            elif palabra.endswith("*"):
+                prefijo = normalizar(palabra[:-1])
+                docs = self.docs_prefijo(prefijo) if prefijo else set()
+            else:
+                tokens = tokenizar(palabra)
+                if not tokens:
+                    continue  # stopword sola
+                docs = set(self.postings.get(tokens[0][1], {}))
+                for _, t in tokens[1:]:
+                    docs &= set(self.postings.get(t, {}))
+            resultado = docs if resultado is None else resultado & docs
+            if not resultado:
+                return set()
+        return resultado or set()
+
+    def agrupar(self, doc_ids, por):
+        """Cuenta resultados por canal, mes, canal-mes o lista los videos."""
+        conteo = Counter()
+        for doc_id in doc_ids:
+            video_id, canal, periodo, tipo, titulo = self.docs[doc_id]
+            nombre = self.canales.get(canal, canal)
+            if por == "canal":
+                conteo[(nombre,)] += 1
+            elif por == "mes":
+                conteo[(periodo,)] += 1
+            elif por == "canal-mes":
+                conteo[(nombre, periodo)] += 1
+            else:
+                conteo[(periodo, nombre, tipo, video_id, titulo)] += 1
+        return conteo
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "construir":
+        inst = iniciar_instrumentacion("indice_texto")
+    ap = argparse.ArgumentParser(description="Índice invertido de títulos y descripciones.")
+    sub = ap.add_subparsers(dest="comando", required=True)
+    sub.add_parser("construir", help="indexar archivos nuevos o modificados")
+    b = sub.add_parser("buscar", help="buscar términos, frases o prefijos")
+    b.add_argument("consulta")
+    b.add_argument("--por", choices=["canal", "mes", "canal-mes", "video"], default="canal-mes")
+    b.add_argument("--limite", type=int, default=50)
+    args = ap.parse_args()
+
+    if args.comando == "construir":
+        with inst.etapa("carga"):
+            indice = Indice.cargar()
+        with inst.etapa("indexado"):
+            cambios = indice.actualizar()
+        if cambios:
+            with inst.etapa("escritura"):
+                indice.guardar()
+        vivos = sum(1 for d in indice.docs if d)
+        print(f"✅ Índice actualizado: {cambios} archivos procesados, {vivos} documentos, "
+              f"{len(indice.postings)} términos en {INDICE_FILE.relative_to(RAIZ)}")
+        return
+
+    indice = Indice.cargar()
+    if not indice.docs:
+        print("⚠️ El índice está vacío. Corré primero: python extractor/indice_texto.py construir")
+        return
+    t0 = time.perf_counter()
+    docs = indice.buscar(args.consulta)
+    conteo = indice.agrupar(docs, args.por)
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"🔎 {len(docs)} videos para «{args.consulta}» ({ms:.1f} ms)")
+    if args.por == "video":
+        for clave in sorted(conteo, reverse=True)[:args.limite]:
+            print("   " + " | ".join(clave))
+    else:
+        for clave, n in sorted(conteo.items(), key=lambda x: (-x[1], x[0]))[:args.limite]:
+            print(f"{n:>6}  " + " | ".join(clave))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Medición de tiempos y memoria por etapa, común a los scripts de extractor/.
+
+Uso desde un script:
+
+    from instrumentacion import iniciar_instrumentacion
+    inst = iniciar_instrumentacion("analyze_all")
+
+    with inst.etapa("carga"):
+        ...
+
+Cada corrida escribe data/tiempos/<script>.json con el tiempo de cada etapa
+(total y cantidad de llamadas) y agrega una línea por etapa a
+data/tiempos/historial.csv para comparar corridas a medida que crecen los canales.
+
+Opciones de línea de comandos (se quitan de sys.argv antes de que el script
+lea las suyas):
+    --profile        guarda cProfile en data/tiempos/<script>.prof y un
+                     resumen pstats ordenado por tiempo acumulado en <script>_perfil.txt
+    --trace-memory   activa tracemalloc y reporta el pico y los sitios que más
+                     memoria asignaron en cada etapa
+"""
+
+import argparse
+import atexit
+import cProfile
+import csv
+import io
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+TIEMPOS_DIR = Path(__file__).resolve().parent.parent / "data" / "tiempos"
+TOP_ASIGNACIONES = 10
+TOP_PERFIL = 40
+
+
+class Instrumentacion:
+    def __init__(self, script, perfil=False, memoria=False, salida=TIEMPOS_DIR):
+        self.script = script
+        self.salida = Path(salida)
+        self.memoria = memoria
+        self.etapas = {}
+        self._pila = []
+        self._picos = []   # pico de memoria acumulado por nivel de la pila (bytes)
+        self._inicio = time.perf_counter()
+        self._fecha = datetime.now().isoformat(timespec="seconds")
+        self._perfil = cProfile.Profile() if perfil else None
+        if self.memoria:
+            tracemalloc.start(25)
+        if self._perfil:
+            self._perfil.enable()
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide una etapa; las anidadas se registran como 'padre/hija' y las repetidas se acumulan."""
+        self._pila.append(nombre)
+        clave = "/".join(self._pila)
+        if self.memoria:
+            antes = tracemalloc.take_snapshot()
+            # reset_peak() es global: antes de reiniciarlo se guarda el pico que llevaba el padre
+            if self._picos:
+                self._picos[-1] = max(self._picos[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._picos.append(0)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - t0
+            self._pila.pop()
+            reg = self.etapas.setdefault(clave, {"segundos": 0.0, "llamadas": 0})
+            reg["segundos"] += segundos
+            reg["llamadas"] += 1
+            if self.memoria:
+                self._registrar_memoria(reg, antes)
+
+    def _registrar_memoria(self, reg, antes):
+        pico = max(self._picos.pop(), tracemalloc.get_traced_memory()[1])
+        if self._picos:
+            self._picos[-1] = max(self._picos[-1], pico)
+        reg["pico_mb"] = round(max(reg.get("pico_mb", 0), pico / 2**20), 2)
+        despues = tracemalloc.take_snapshot()
+        sitios = reg.setdefault("asignaciones_kb", {})
+        for stat in despues.compare_to(antes, "lineno")[:TOP_ASIGNACIONES]:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            sitio = f"{frame.filename}:{frame.lineno}"
+            sitios[sitio] = round(sitios.get(sitio, 0) + stat.size_diff / 1024, 1)
+
+    def resumen(self):
+        etapas = {}
+        for clave, reg in self.etapas.items():
+            etapa = {"segundos": round(reg["segundos"], 4), "llamadas": reg["llamadas"]}
+            if "pico_mb" in reg:
+                etapa["pico_mb"] = reg["pico_mb"]
+                top = sorted(reg["asignaciones_kb"].items(), key=lambda x: -x[1])[:TOP_ASIGNACIONES]
+                etapa["top_asignaciones_kb"] = dict(top)
+            etapas[clave] = etapa
+        return {
+            "script": self.script,
+            "fecha": self._fecha,
+            "total_segundos": round(time.perf_counter() - self._inicio, 4),
+            "etapas": etapas,
+        }
+
+    def finalizar(self):
+        self.salida.mkdir(parents=True, exist_ok=True)
+        if self._perfil:
+            self._perfil.disable()
+            self._perfil.dump_stats(self.salida / f"{self.script}.prof")
+            texto = io.StringIO()
+            pstats.Stats(self._perfil, stream=texto).sort_stats("cumulative").print_stats(TOP_PERFIL)
+            (self.salida / f"{self.script}_perfil.txt").write_text(texto.getvalue(), encoding="utf-8")
+        if self.memoria:
+            tracemalloc.stop()
+
+        resumen = self.resumen()
+        (self.salida / f"{self.script}.json").write_text(
+            json.dumps(resumen, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+        historial = self.salida / "historial.csv"
+        nuevo = not historial.exists()
+        with open(historial, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if nuevo:
+                writer.writerow(["fecha", "script", "etapa", "segundos", "llamadas"])
+            writer.writerow([resumen["fecha"], self.script, "TOTAL", resumen["total_segundos"], 1])
+            for clave, etapa in resumen["etapas"].items():
+                writer.writerow([resumen["fecha"], self.script, clave, etapa["segundos"], etapa["llamadas"]])
+
+        lineas = [f"⏱️  {self.script}: {resumen['total_segundos']:.2f}s"]
+        for clave, etapa in sorted(resumen["etapas"].items(), key=lambda x: -x[1]["segundos"]):
+            lineas.append(f"   {clave:<30} {etapa['segundos']:>9.2f}s  ×{etapa['llamadas']}")
+        print("\n".join(lineas))
+
+
+def iniciar_instrumentacion(script):
+    """Lee --profile / --trace-memory de sys.argv y registra el resumen al terminar el proceso."""
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument("--profile", action="store_true")
+    ap.add_argument("--trace-memory", action="store_true")
+    opciones, resto = ap.parse_known_args(sys.argv[1:])
+    sys.argv[1:] = resto
+    inst = Instrumentacion(script, perfil=opciones.profile, memoria=opciones.trace_memory)
+    atexit.register(inst.finalizar)
+    return inst
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Muestreador de espectadores concurrentes para vivos en curso.
+
+Proceso de larga duración que, para los canales de extractor/channels.csv:
+ - Descubre qué canales están transmitiendo recorriendo sus últimos uploads
+   (playlistItems.list, 1 unidad por canal) y filtrando con videos.list los que
+   tienen liveBroadcastContent = live/upcoming. Evita search.list con
+   eventType=live, que cuesta 100 unidades por canal.
+ - Consulta liveStreamingDetails.concurrentViewers de todos los vivos activos
+   en llamadas videos.list de hasta 50 IDs (1 unidad por llamada).
+ - Reparte la cuota diaria dentro de la duración de la corrida: el
+   descubrimiento se espacia para no usar más del 40% según la cantidad de
+   canales, y el intervalo de muestreo se adapta a la cantidad de vivos activos.
+ - Escribe en data/vivos_concurrentes/:
+     • curvas_MM-YYYY.csv.gz: una fila por muestra (video_id, ts, espectadores).
+     • resumen_MM-YYYY.csv: una fila por vivo con pico y promedio de
+       concurrencia, que youtube_report.py une a las filas de videos_*.csv.
+
+Uso:
+    python extractor/muestreo_vivos.py [--cuota-diaria 8000] [--duracion-horas 5.5]
+"""
+
+import argparse
+import csv
+import gzip
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from instrumentacion import iniciar_instrumentacion
+from resolver_canales import resolver_canales
+
+# — logging —
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(message)s",
+    datefmt="%H:%M:%S"
+)
+log = logging.getLogger()
+
+CHANNELS_FILE = Path("extractor/channels.csv")
+OUTPUT_DIR = Path("data/vivos_concurrentes")
+
+LOTE_MAX = 50            # IDs por llamada a videos.list
+GAP_MAX_SEG = 15 * 60    # huecos más largos no se integran en el promedio
+FRACCION_DESCUBRIMIENTO = 0.4  # parte de la cuota que puede gastar el descubrimiento
+
+COLUMNAS_RESUMEN = [
+    "channel_id", "video_id", "mes", "inicio_ts", "fin_ts", "muestras",
+    "ultimo_espectadores", "espectador_segundos", "segundos_muestreados",
+    "peak_concurrent_viewers", "avg_concurrent_viewers", "finalizado"
+]
+
+
+def mes_actual():
+    return datetime.now().strftime("%m-%Y")
+
+
+def uploads_playlist(channel_id):
+    """La playlist de uploads de un canal es su ID con prefijo UU en lugar de UC."""
+    return "UU" + channel_id[2:]
+
+
+def lotes(ids, tamanio=LOTE_MAX):
+    ids = list(ids)
+    for i in range(0, len(ids), tamanio):
+        yield ids[i:i + tamanio]
+
+
+@dataclass(slots=True)
+class EstadoVivo:
+    """Acumulador de un vivo: sólo guarda agregados, la curva va a disco."""
+    channel_id: str
+    video_id: str
+    mes: str
+    inicio_ts: int = 0
+    fin_ts: int = 0
+    muestras: int = 0
+    ultimo_espectadores: int = 0
+    espectador_segundos: float = 0.0
+    segundos_muestreados: float = 0.0
+    pico: int = 0
+    finalizado: bool = False
+
+    def registrar(self, ts, espectadores):
+        if self.muestras:
+            dt = ts - self.fin_ts
+            if 0 < dt <= GAP_MAX_SEG:
+                # Integración por trapecios: el promedio queda ponderado por tiempo
+                self.espectador_segundos += dt * (self.ultimo_espectadores + espectadores) / 2
+                self.segundos_muestreados += dt
+        else:
+            self.inicio_ts = ts
+        self.fin_ts = ts
+        self.muestras += 1
+        self.ultimo_espectadores = espectadores
+        self.pico = max(self.pico, espectadores)
+
+    @property
+    def promedio(self):
+        if self.segundos_muestreados > 0:
+            return round(self.espectador_segundos / self.segundos_muestreados, 1)
+        return float(self.ultimo_espectadores) if self.muestras else None
+
+    def como_fila(self):
+        return {
+            "channel_id": self.channel_id,
+            "video_id": self.video_id,
+            "mes": self.mes,
+            "inicio_ts": self.inicio_ts,
+            "fin_ts": self.fin_ts,
+            "muestras": self.muestras,
+            "ultimo_espectadores": self.ultimo_espectadores,
+            "espectador_segundos": round(self.espectador_segundos, 1),
+            "segundos_muestreados": round(self.segundos_muestreados, 1),
+            "peak_concurrent_viewers": self.pico,
+            "avg_concurrent_viewers": self.promedio,
+            "finalizado": int(self.finalizado)
+        }
+
+    @classmethod
+    def desde_fila(cls, fila):
+        return cls(
+            channel_id=fila["channel_id"],
+            video_id=fila["video_id"],
+            mes=fila["mes"],
+            inicio_ts=int(fila["inicio_ts"]),
+            fin_ts=int(fila["fin_ts"]),
+            muestras=int(fila["muestras"]),
+            ultimo_espectadores=int(fila["ultimo_espectadores"]),
+            espectador_segundos=float(fila["espectador_segundos"]),
+            segundos_muestreados=float(fila["segundos_muestreados"]),
+            pico=int(fila["peak_concurrent_viewers"]),
+            finalizado=fila["finalizado"] == "1"
+        )
+
+
+# ==== Persistencia ====
+def ruta_resumen(mes):
+    return OUTPUT_DIR / f"resumen_{mes}.csv"
+
+
+def ruta_curvas(mes):
+    return OUTPUT_DIR / f"curvas_{mes}.csv.gz"
+
+
+def leer_resumen(mes):
+    ruta = ruta_resumen(mes)
+    if not ruta.exists():
+        return {}
+    with open(ruta, newline="", encoding="utf-8") as f:
+        return {fila["video_id"]: fila for fila in csv.DictReader(f)}
+
+
+def guardar_resumen(estados):
+    """
+    Actualiza (upsert por video_id) el resumen de cada mes presente en `estados`.
+    Los vivos sin ninguna muestra (programados que no se llegaron a medir) no se guardan.
+    """
+    por_mes = {}
+    for estado in estados:
+        if estado.muestras:
+            por_mes.setdefault(estado.mes, []).append(estado)
+    for mes, grupo in por_mes.items():
+        filas = {vid: fila for vid, fila in leer_resumen(mes).items() if fila["muestras"] != "0"}
+        for estado in grupo:
+            filas[estado.video_id] = estado.como_fila()
+        ruta = ruta_resumen(mes)
+        tmp = ruta.with_suffix(".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNAS_RESUMEN)
+            writer.writeheader()
+            writer.writerows(filas.values())
+        os.replace(tmp, ruta)
+
+
+def cargar_pendientes():
+    """Retoma los vivos no finalizados del mes en curso (p. ej. tras un reinicio)."""
+    return {
+        vid: EstadoVivo.desde_fila(fila)
+        for vid, fila in leer_resumen(mes_actual()).items()
+        if fila["finalizado"] != "1"
+    }
+
+
+def escribir_curvas(muestras):
+    """Agrega las muestras del ciclo como un nuevo miembro gzip del archivo del mes."""
+    por_mes = {}
+    for mes, fila in muestras:
+        por_mes.setdefault(mes, []).append(fila)
+    for mes, filas in por_mes.items():
+        ruta = ruta_curvas(mes)
+        nuevo = not ruta.exists()
+        with gzip.open(ruta, "at", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if nuevo:
+                writer.writerow(["video_id", "ts", "espectadores"])
+            writer.writerows(filas)
+
+
+def cargar_concurrencia(directorio=OUTPUT_DIR):
+    """Devuelve {video_id: (pico, promedio)} con todos los resúmenes disponibles."""
+    concurrencia = {}
+    for ruta in sorted(Path(directorio).glob("resumen_*.csv")):
+        with open(ruta, newline="", encoding="utf-8") as f:
+            for fila in csv.DictReader(f):
+                if fila["muestras"] == "0":
+                    continue  # sin muestras: la concurrencia queda en blanco, no en 0
+                concurrencia[fila["video_id"]] = (
+                    int(fila["peak_concurrent_viewers"]),
+                    float(fila["avg_concurrent_viewers"]) if fila["avg_concurrent_viewers"] else None
+                )
+    return concurrencia
+
+
+# ==== API ====
+def descubrir_vivos(youtube, channel_ids, recientes):
+    """Devuelve {video_id: channel_id} de los vivos en curso o por empezar."""
+    candidatos = {}
+    for cid in channel_ids:
+        try:
+            resp = youtube.playlistItems().list(
+                part="contentDetails", playlistId=uploads_playlist(cid), maxResults=recientes
+            ).execute()
+        except HttpError as e:
+            log.warning(f"No se pudo leer uploads de {cid}: {e}")
+            continue
+        for item in resp.get("items", []):
+            candidatos[item["contentDetails"]["videoId"]] = cid
+
+    activos = {}
+    for lote in lotes(candidatos):
+        resp = youtube.videos().list(part="snippet", id=",".join(lote)).execute()
+        for d in resp.get("items", []):
+            if d["snippet"].get("liveBroadcastContent") in ("live", "upcoming"):
+                activos[d["id"]] = candidatos[d["id"]]
+    return activos
+
+
+def consultar_concurrentes(youtube, video_ids):
+    """Genera (video_id, espectadores | None, terminado) para cada vivo consultado."""
+    for lote in lotes(video_ids):
+        resp = youtube.videos().list(part="liveStreamingDetails", id=",".join(lote)).execute()
+        vistos = set()
+        for d in resp.get("items", []):
+            vistos.add(d["id"])
+            det = d.get("liveStreamingDetails", {})
+            espectadores = det.get("concurrentViewers")
+            yield d["id"], int(espectadores) if espectadores is not None else None, "actualEndTime" in det
+        # Los IDs que ya no devuelve la API (borrados o privados) se dan por terminados
+        for vid in set(lote) - vistos:
+            yield vid, None, True
+
+
+def calcular_redescubrimiento(n_canales, args, horizonte):
+    """
+    Segundos entre descubrimientos y su costo total en la corrida. Cada descubrimiento cuesta
+    1 unidad por canal más videos.list sobre los candidatos; se espacian tanto como haga falta
+    para no pasar FRACCION_DESCUBRIMIENTO de la cuota en `horizonte` segundos
+    (--redescubrir-min es el mínimo).
+    """
+    costo = n_canales + math.ceil(n_canales * args.recientes / LOTE_MAX)
+    tope = args.cuota_diaria * FRACCION_DESCUBRIMIENTO
+    if costo > tope:
+        log.warning(f"Un solo descubrimiento ({costo} unidades) supera la cuota reservada ({tope:.0f})")
+    segundos = max(args.redescubrir_min * 60, horizonte / max(int(tope // costo), 1))
+    return segundos, math.ceil(horizonte / segundos) * costo
+
+
+def calcular_intervalo(n_activos, args, costo_descubrimiento, horizonte):
+    """Segundos entre muestras: tan seguido como permita la cuota que deja el descubrimiento en la corrida."""
+    if not n_activos:
+        return args.redescubrir_min * 60
+    llamadas = math.ceil(n_activos / LOTE_MAX)
+    presupuesto = max(args.cuota_diaria - costo_descubrimiento, llamadas)
+    intervalo = horizonte * llamadas / presupuesto
+    if intervalo > args.intervalo_max:
+        log.warning(f"Cuota insuficiente para {n_activos} vivos a {args.intervalo_max}s; se usará ese intervalo igual")
+    return min(max(intervalo, args.intervalo_min), args.intervalo_max)
+
+
+# ==== MAIN ====
+def main():
+    inst = iniciar_instrumentacion("muestreo_vivos")
+    ap = argparse.ArgumentParser(description="Muestrea espectadores concurrentes de vivos en curso.")
+    ap.add_argument("--cuota-diaria", type=int, default=8000, help="unidades de API disponibles por día")
+    ap.add_argument("--intervalo-min", type=float, default=30, help="segundos mínimos entre muestras")
+    ap.add_argument("--intervalo-max", type=float, default=300, help="segundos máximos entre muestras")
+    ap.add_argument("--redescubrir-min", type=float, default=10,
+                    help="minutos mínimos entre búsquedas de vivos nuevos (se espacian más si la cuota no alcanza)")
+    ap.add_argument("--recientes", type=int, default=5, help="uploads recientes a revisar por canal")
+    ap.add_argument("--duracion-horas", type=float, default=None, help="cortar después de N horas")
+    args = ap.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv("YOUTUBE_API_KEY", "")
+    if not api_key:
+        log.error("YOUTUBE_API_KEY no está configurada.")
+        raise SystemExit(1)
+    youtube = build("youtube", "v3", developerKey=api_key)
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    with open(CHANNELS_FILE, newline="", encoding="utf-8") as f:
+        channel_ids = [c["channel_id"] for c in resolver_canales(csv.DictReader(f), api_key)]
+
+    # Costo de descubrimiento: 1 unidad por canal + videos.list sobre los candidatos
+    # La cuota es diaria: una corrida acotada (--duracion-horas) puede gastarla entera en su ventana
+    horizonte = args.duracion_horas * 3600 if args.duracion_horas else 86400
+    redescubrir_seg, costo_descubrimiento = calcular_redescubrimiento(len(channel_ids), args, horizonte)
+    log.info(f"🔍 Descubrimiento cada {redescubrir_seg / 60:.0f} min (~{costo_descubrimiento} unidades en la corrida)")
+
+    estados = cargar_pendientes()
+    if estados:
+        log.info(f"♻️  Retomando {len(estados)} vivos pendientes")
+    limite = time.monotonic() + args.duracion_horas * 3600 if args.duracion_horas else None
+    proximo_descubrimiento = 0.0
+    espera_error = args.intervalo_min
+
+    try:
+        while limite is None or time.monotonic() < limite:
+            try:
+                if time.monotonic() >= proximo_descubrimiento:
+                    with inst.etapa("descubrimiento"):
+                        activos = descubrir_vivos(youtube, channel_ids, args.recientes)
+                    for vid, cid in activos.items():
+                        if vid not in estados:
+                            estados[vid] = EstadoVivo(channel_id=cid, video_id=vid, mes=mes_actual())
+                    with inst.etapa("escritura"):
+                        guardar_resumen(estados.values())
+                    proximo_descubrimiento = time.monotonic() + redescubrir_seg
+                    log.info(f"🔍 Vivos activos o programados: {len(estados)}")
+
+                ts = int(time.time())
+                with inst.etapa("muestreo"):
+                    # Se consultan todos los lotes antes de tocar los estados: si falla uno, no queda a medias
+                    consultados = list(consultar_concurrentes(youtube, list(estados)))
+            except (HttpError, OSError) as e:
+                # Un error transitorio (5xx, timeout) no corta la ventana del día: se espera y se reintenta
+                log.warning(f"Error de API, se reintenta en {espera_error:.0f}s: {e}")
+                time.sleep(espera_error)
+                espera_error = min(espera_error * 2, args.intervalo_max)
+                continue
+            espera_error = args.intervalo_min
+
+            muestras, terminados = [], []
+            for vid, espectadores, terminado in consultados:
+                estado = estados[vid]
+                if espectadores is not None:
+                    estado.registrar(ts, espectadores)
+                    muestras.append((estado.mes, (vid, ts, espectadores)))
+                if terminado:
+                    estado.finalizado = True
+                    terminados.append(estado)
+            if muestras:
+                with inst.etapa("escritura"):
+                    escribir_curvas(muestras)
+            if terminados:
+                # Los vivos terminados se persisten y se liberan de memoria
+                with inst.etapa("escritura"):
+                    guardar_resumen(terminados)
+                for estado in terminados:
+                    del estados[estado.video_id]
+                log.info(f"🏁 Vivos finalizados: {len(terminados)}")
+
+            en_vivo = sum(1 for e in estados.values() if e.muestras)
+            intervalo = calcular_intervalo(len(estados), args, costo_descubrimiento, horizonte)
+            log.info(f"📈 {len(muestras)} muestras · {en_vivo} en vivo · próxima en {intervalo:.0f}s")
+            time.sleep(min(intervalo, max(proximo_descubrimiento - time.monotonic(), 1)))
+    except KeyboardInterrupt:
+        log.info("Interrumpido, guardando estado…")
+    finally:
+        guardar_resumen(estados.values())
+        log.info(f"✅ Resumen guardado en {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
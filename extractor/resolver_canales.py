@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Resolución de URLs y handles de extractor/channels.csv a channel IDs.
+
+Normaliza cada channel_url (quita ?si=..., barras y mayúsculas del handle) y
+resuelve con channels.list:
+ - IDs conocidos: en lotes de hasta 50 por llamada (id=UC...,UC...).
+ - Filas sin channel_id, o con un ID que no existe: por forHandle (@handle),
+   forUsername (/user/...) o el ID de /channel/UC... que trae la URL.
+Cada canal resuelto se guarda en data/cache/canales_resueltos.json con su
+título canónico y la playlist de uploads, así las corridas siguientes no hacen
+ninguna llamada para los canales ya conocidos.
+
+youtube_report.py y shorts_analysis.py lo usan antes de procesar los canales,
+de modo que ninguna fila queda afuera sin aviso.
+
+Uso:
+    python extractor/resolver_canales.py [--actualizar-csv]
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+import requests
+from dotenv import load_dotenv
+
+YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
+CHANNELS_FILE = Path("extractor/channels.csv")
+CACHE_FILE = Path("data/cache/canales_resueltos.json")
+LOTE_MAX = 50
+ID_RE = re.compile(r"^UC[\w-]{22}$")
+
+
+def normalizar(valor):
+    """
+    Devuelve una clave canónica para una URL, handle o ID de canal:
+        https://youtube.com/@FloydTVOnline?si=xx → @floydtvonline
+        https://www.youtube.com/channel/UCxxxx   → UCxxxx
+        https://www.youtube.com/user/Nombre      → user:nombre
+    None si no se reconoce.
+    """
+    valor = unquote((valor or "").strip())
+    if not valor:
+        return None
+    if ID_RE.match(valor):
+        return valor
+    if valor.startswith("@"):
+        return valor.split("?")[0].rstrip("/").lower()
+    partes = [p for p in urlparse(valor if "//" in valor else f"//{valor}").path.split("/") if p]
+    if not partes:
+        return None
+    if partes[0].startswith("@"):
+        return partes[0].lower()
+    if len(partes) > 1 and partes[0] == "channel" and ID_RE.match(partes[1]):
+        return partes[1]
+    if len(partes) > 1 and partes[0] == "user":
+        return f"user:{partes[1].lower()}"
+    return None
+
+
+class CacheCanales:
+    def __init__(self, ruta=CACHE_FILE):
+        self.ruta = Path(ruta)
+        datos = json.loads(self.ruta.read_text(encoding="utf-8")) if self.ruta.exists() else {}
+        self.canales = datos.get("canales", {})   # channel_id → {titulo, uploads_playlist, handle, resuelto}
+        self.claves = datos.get("claves", {})     # @handle / user:nombre → channel_id
+        self.cambios = False
+
+    def agregar(self, item, clave=None):
+        cid = item["id"]
+        snippet = item.get("snippet", {})
+        handle = (snippet.get("customUrl") or "").lower() or None
+        self.canales[cid] = {
+            "titulo": snippet.get("title", "").strip(),
+            "uploads_playlist": item.get("contentDetails", {}).get("relatedPlaylists", {}).get("uploads"),
+            "handle": handle,
+            "resuelto": datetime.now().isoformat(timespec="seconds"),
+        }
+        for k in {clave, handle} - {None}:
+            self.claves[k] = cid
+        self.cambios = True
+        return cid
+
+    def buscar(self, clave):
+        if clave is None:
+            return None
+        cid = clave if clave in self.canales else self.claves.get(clave)
+        return cid if cid in self.canales else None
+
+    def guardar(self):
+        if not self.cambios:
+            return
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self.ruta.write_text(json.dumps(
+            {"canales": dict(sorted(self.canales.items())), "claves": dict(sorted(self.claves.items()))},
+            indent=2, ensure_ascii=False
+        ), encoding="utf-8")
+        self.cambios = False
+
+
+def _channels_list(api_key, **params):
+    resp = requests.get(
+        f"{YOUTUBE_API_URL}/channels",
+        params={"key": api_key, "part": "snippet,contentDetails", "maxResults": LOTE_MAX, **params},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return resp.json().get("items", [])
+
+
+def _consultar_clave(clave, api_key):
+    if clave.startswith("@"):
+        return _channels_list(api_key, forHandle=clave)
+    if clave.startswith("user:"):
+        return _channels_list(api_key, forUsername=clave[len("user:"):])
+    return _channels_list(api_key, id=clave)
+
+
+def resolver_canales(canales, api_key=None, col_id="channel_id", col_url="channel_url", cache=None):
+    """
+    Completa channel_id, titulo y uploads_playlist en cada fila de channels.csv.
+
+    Devuelve las filas resueltas (mismo orden, sin duplicados por ID) y avisa
+    de las que no se pudieron resolver. Sólo llama a la API por lo que no está en caché.
+    """
+    cache = cache or CacheCanales()
+    api_key = api_key or os.getenv("YOUTUBE_API_KEY", "")
+    filas = [dict(c) for c in canales]
+
+    # 1) IDs escritos en el CSV que todavía no están en caché: lotes de 50
+    ids_csv = {(f.get(col_id) or "").strip() for f in filas}
+    pendientes = sorted(i for i in ids_csv if ID_RE.match(i) and cache.buscar(i) is None)
+    for i in range(0, len(pendientes), LOTE_MAX):
+        for item in _channels_list(api_key, id=",".join(pendientes[i:i + LOTE_MAX])):
+            cache.agregar(item)
+
+    # 2) Filas sin ID válido: por la URL (handle, usuario o /channel/ID), una vez por clave
+    consultadas = set(pendientes)
+    resueltas, vistos = [], set()
+    for fila in filas:
+        cid_csv = (fila.get(col_id) or "").strip()
+        if not cid_csv and not (fila.get(col_url) or "").strip():
+            continue  # fila vacía
+        cid = cache.buscar(cid_csv)
+        if cid is None:
+            clave = normalizar(fila.get(col_url))
+            cid = cache.buscar(clave)
+            if cid is None and clave and clave not in consultadas:
+                consultadas.add(clave)
+                items = _consultar_clave(clave, api_key)
+                cid = cache.agregar(items[0], clave) if items else None
+            if cid is None:
+                print(f"⚠️  No se pudo resolver el canal: id='{cid_csv}' url='{fila.get(col_url, '')}'")
+                continue
+            if cid_csv:
+                # Se recuerda la corrección para no volver a consultar el ID inválido
+                print(f"🔁 channel_id {cid_csv} no existe; se usa {cid} ({clave})")
+                cache.claves[cid_csv] = cid
+                cache.cambios = True
+        if cid in vistos:
+            continue
+        vistos.add(cid)
+        fila[col_id] = cid
+        fila["titulo"] = cache.canales[cid]["titulo"]
+        fila["uploads_playlist"] = cache.canales[cid]["uploads_playlist"]
+        resueltas.append(fila)
+
+    cache.guardar()
+    return resueltas
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Resuelve handles y URLs de channels.csv a channel IDs.")
+    ap.add_argument("--actualizar-csv", action="store_true",
+                    help="escribir en channels.csv los channel_id resueltos")
+    args = ap.parse_args()
+    load_dotenv()
+
+    with open(CHANNELS_FILE, newline='', encoding='utf-8') as f:
+        lector = csv.DictReader(f)
+        columnas = lector.fieldnames
+        canales = [c for c in lector if any((v or "").strip() for v in c.values())]
+    resueltas = resolver_canales(canales)
+    print(f"✅ {len(resueltas)} de {len(canales)} canales resueltos (caché: {CACHE_FILE})")
+
+    if args.actualizar_csv:
+        por_url = {normalizar(c["channel_url"]): c["channel_id"] for c in resueltas}
+        for c in canales:
+            c["channel_id"] = por_url.get(normalizar(c["channel_url"]), c["channel_id"])
+        with open(CHANNELS_FILE, "w", newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columnas)
+            writer.writeheader()
+            writer.writerows(canales)
+        print(f"📝 channel_id actualizados en {CHANNELS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Extracción repartida en shards y unión de los resultados parciales.
+
+youtube_report.py y shorts_analysis.py aceptan:
+    --shard i/N        procesa sólo la partición i (0..N-1) de extractor/channels.csv
+    --shard-por MODO   hash (por defecto): md5 del channel_id módulo N
+                       region: cada combinación provincia/tipo es una partición
+                       y se reparten en orden entre los N shards
+También se pueden indicar con las variables SHARD_INDEX, SHARD_TOTAL y SHARD_MODO
+(útil en un matrix de GitHub Actions). Cada shard usa YOUTUBE_API_KEY_SHARD_<i>
+si está definida, y si no YOUTUBE_API_KEY.
+
+Un shard escribe en data/parciales/shard_<i>-de-<N>/ con la misma estructura
+que data/ (canales/, videos/, shorts_stats/). Después:
+
+    python extractor/shards.py unir [--parcial]
+
+concatena los report_*.csv/xlsx y shorts_*.csv de todos los shards en el orden
+de channels.csv, copia las carpetas de videos por canal a data/videos/ y borra
+data/parciales/. Cada shard deja <script>.json con los canales que le tocaron y
+si terminó; sin --parcial, `unir` falla si falta algún shard o alguno no terminó,
+y avisa qué canales registrados no tienen filas en las tablas unidas.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+CHANNELS_FILE = Path("extractor/channels.csv")
+DATA_DIR = Path("data")
+PARCIALES_DIR = DATA_DIR / "parciales"
+MODOS = ("hash", "region")
+
+
+def leer_canales():
+    with open(CHANNELS_FILE, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def particion_hash(channel_id, total):
+    return int(hashlib.md5(channel_id.strip().encode()).hexdigest(), 16) % total
+
+
+@dataclass(frozen=True)
+class Shard:
+    indice: int = 0
+    total: int = 1
+    modo: str = "hash"
+
+    @property
+    def nombre(self):
+        return f"shard_{self.indice}-de-{self.total}"
+
+    def directorio(self):
+        """Raíz de salida: data/ sin shards, data/parciales/shard_i-de-N/ con shards."""
+        return DATA_DIR if self.total == 1 else PARCIALES_DIR / self.nombre
+
+    def api_key(self):
+        return os.getenv(f"YOUTUBE_API_KEY_SHARD_{self.indice}") or os.getenv("YOUTUBE_API_KEY", "")
+
+    def filtrar(self, canales, col_id="channel_id"):
+        """Devuelve los canales (dicts de channels.csv) que le tocan a este shard, en el mismo orden."""
+        if self.total == 1:
+            return list(canales)
+        if self.modo == "region":
+            regiones = sorted({(c.get("provincia") or "", c.get("tipo") or "") for c in canales})
+            asignacion = {r: i % self.total for i, r in enumerate(regiones)}
+            return [c for c in canales
+                    if asignacion[(c.get("provincia") or "", c.get("tipo") or "")] == self.indice]
+        return [c for c in canales if particion_hash(c.get(col_id) or "", self.total) == self.indice]
+
+    def registrar(self, script, canales, col_id="channel_id"):
+        """Deja constancia de qué canales le tocan al shard, para que `unir` detecte faltantes."""
+        if self.total == 1:
+            return
+        directorio = self.directorio()
+        directorio.mkdir(parents=True, exist_ok=True)
+        (directorio / f"{script}.json").write_text(json.dumps({
+            "shard": self.indice, "total": self.total, "modo": self.modo, "completo": False,
+            "canales": [c.get(col_id) for c in canales],
+        }, indent=2), encoding="utf-8")
+
+    def completar(self, script):
+        """Marca que el script terminó; un shard que se cortó antes queda como incompleto."""
+        if self.total == 1:
+            return
+        ruta = self.directorio() / f"{script}.json"
+        registro = json.loads(ruta.read_text(encoding="utf-8"))
+        registro["completo"] = True
+        ruta.write_text(json.dumps(registro, indent=2), encoding="utf-8")
+
+
+def iniciar_shard():
+    """Lee --shard / --shard-por (o SHARD_INDEX, SHARD_TOTAL, SHARD_MODO) y los quita de sys.argv."""
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument("--shard")
+    ap.add_argument("--shard-por", choices=MODOS)
+    opciones, resto = ap.parse_known_args(sys.argv[1:])
+    sys.argv[1:] = resto
+
+    valor = opciones.shard
+    if not valor and os.getenv("SHARD_TOTAL"):
+        valor = f"{os.getenv('SHARD_INDEX', '0')}/{os.getenv('SHARD_TOTAL')}"
+    modo = opciones.shard_por or os.getenv("SHARD_MODO") or "hash"
+    if not valor:
+        return Shard()
+    try:
+        indice, total = (int(x) for x in valor.split("/"))
+    except ValueError:
+        sys.exit(f"❌ --shard debe tener la forma i/N (recibido: {valor})")
+    if not 0 <= indice < total or modo not in MODOS:
+        sys.exit(f"❌ Shard inválido: {valor} ({modo})")
+    return Shard(indice, total, modo)
+
+
+# ==== Unión de parciales ====
+def _leer_tabla(archivo):
+    try:
+        if archivo.suffix == ".xlsx":
+            return pd.read_excel(archivo)
+        return pd.read_csv(archivo, dtype=str, keep_default_na=False)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def unir(parcial=False):
+    shards = sorted(d for d in PARCIALES_DIR.glob("shard_*-de-*") if d.is_dir())
+    if not shards:
+        print(f"⚠️ No hay resultados parciales en {PARCIALES_DIR}")
+        return
+    totales = {int(d.name.rsplit("-de-", 1)[1]) for d in shards}
+    if len(totales) > 1:
+        sys.exit(f"❌ Hay parciales de corridas con distinta cantidad de shards: {sorted(totales)}")
+    total = totales.pop()
+    if len(shards) < total and not parcial:
+        presentes = ", ".join(d.name for d in shards)
+        sys.exit(f"❌ Faltan shards: hay {len(shards)} de {total} ({presentes}). Usá --parcial para unir igual.")
+
+    # Registros de cada shard: qué canales le tocaron y si el script terminó
+    registrados, incompletos = set(), []
+    for directorio in shards:
+        for ruta in sorted(directorio.glob("*.json")):
+            registro = json.loads(ruta.read_text(encoding="utf-8"))
+            registrados.update(registro["canales"])
+            if not registro.get("completo"):
+                incompletos.append(f"{directorio.name}/{ruta.stem}")
+    if incompletos and not parcial:
+        sys.exit(f"❌ Shards que no terminaron: {', '.join(incompletos)}. Usá --parcial para unir igual.")
+
+    orden = {c["channel_id"].strip(): i for i, c in enumerate(leer_canales())}
+    tablas = {}
+    copiados = 0
+    for directorio in shards:
+        for archivo in sorted(directorio.rglob("*")):
+            if not archivo.is_file() or archivo.suffix == ".json":
+                continue
+            rel = archivo.relative_to(directorio)
+            if rel.parts[0] == "videos":
+                # Las carpetas de videos son por canal: cada una sale de un único shard
+                destino = DATA_DIR / rel
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(archivo, destino)
+                copiados += 1
+            else:
+                tablas.setdefault(rel, []).append(archivo)
+
+    unidos = set()
+    for rel, archivos in sorted(tablas.items()):
+        partes = [df for df in map(_leer_tabla, archivos) if not df.empty]
+        if not partes:
+            continue
+        df = pd.concat(partes, ignore_index=True)
+        if "CanalID" in df:
+            unidos.update(df["CanalID"])
+            df = df.sort_values("CanalID", key=lambda s: s.map(orden).fillna(len(orden)), kind="stable")
+        destino = DATA_DIR / rel
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        if destino.suffix == ".xlsx":
+            df.to_excel(destino, index=False)
+        else:
+            df.to_csv(destino, index=False)
+        print(f"🧩 {destino}: {len(df)} filas de {len(partes)} shards")
+
+    # Canales salteados (sin Shorts, eliminados) también aparecen acá: es un aviso, no un error
+    sin_filas = sorted(registrados - unidos)
+    if sin_filas:
+        print(f"⚠️ {len(sin_filas)} canales registrados sin filas en las tablas unidas: {', '.join(sin_filas)}")
+
+    shutil.rmtree(PARCIALES_DIR)
+    print(f"✅ Unidos {len(shards)} shards ({copiados} archivos de videos copiados)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Herramientas para la extracción por shards.")
+    sub = ap.add_subparsers(dest="comando", required=True)
+    u = sub.add_parser("unir", help="unir data/parciales/ en data/")
+    u.add_argument("--parcial", action="store_true", help="unir aunque falten shards")
+    p = sub.add_parser("listar", help="mostrar qué canales le tocan a cada shard")
+    p.add_argument("total", type=int)
+    p.add_argument("--shard-por", choices=MODOS, default="hash")
+    args = ap.parse_args()
+
+    if args.comando == "unir":
+        unir(parcial=args.parcial)
+    else:
+        canales = leer_canales()
+        for i in range(args.total):
+            asignados = Shard(i, args.total, args.shard_por).filtrar(canales)
+            regiones = sorted({f"{c['provincia']}/{c['tipo']}" for c in asignados})
+            print(f"shard {i}/{args.total}: {len(asignados)} canales — {', '.join(regiones)}")
+
+
+if __name__ == "__main__":
+    main()
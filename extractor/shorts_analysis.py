@@ -11,7 +11,6 @@ Para cada canal:
      • shorts_details_YYYY‑MM.csv: fila por cada Short con sus métricas.
 """
 
-import os
 import time
 import logging
 from datetime import datetime, timedelta, timezone
@@ -22,6 +21,14 @@ import requests
 from isodate import parse_duration
 from dotenv import load_dotenv
 
+from instrumentacion import iniciar_instrumentacion
+from resolver_canales import resolver_canales
+from shards import iniciar_shard
+
+inst = iniciar_instrumentacion("shorts_analysis")
+# Con --shard i/N se procesa sólo una partición de canales y se escribe en data/parciales/
+shard = iniciar_shard()
+
 # — logging —
 logging.basicConfig(
     level=logging.INFO,
@@ -32,7 +39,7 @@ log = logging.getLogger()
 
 # — cargar API key —
 load_dotenv()
-API_KEY = os.getenv("YOUTUBE_API_KEY", "")
+API_KEY = shard.api_key()
 if not API_KEY:
     log.error("YOUTUBE_API_KEY no está configurada.")
     exit(1)
@@ -41,7 +48,7 @@ YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
 
 # — paths de entrada/salida —
 CHANNELS_FILE = Path("extractor/channels.csv")
-OUTPUT_DIR = Path("data/shorts_stats")
+OUTPUT_DIR = shard.directorio() / "shorts_stats"
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 def get_shorts_for_channel(channel_id):
@@ -59,9 +66,10 @@ def get_shorts_for_channel(channel_id):
     }
     items = []
     while True:
-        resp = requests.get(f"{YOUTUBE_API_URL}/search", params=params)
-        resp.raise_for_status()
-        data = resp.json()
+        with inst.etapa("api_busqueda"):
+            resp = requests.get(f"{YOUTUBE_API_URL}/search", params=params)
+            resp.raise_for_status()
+            data = resp.json()
         batch = data.get("items", [])
         log.info(f"🔍 search.list: obtuvo {len(batch)} vídeos")
         items.extend(batch)
@@ -76,16 +84,17 @@ def get_video_details(video_ids):
     details = []
     for i in range(0, len(video_ids), 50):
         chunk = video_ids[i:i+50]
-        resp = requests.get(
-            f"{YOUTUBE_API_URL}/videos",
-            params={
-                "key": API_KEY,
-                "id": ",".join(chunk),
-                "part": "snippet,contentDetails,statistics"
-            }
-        )
-        resp.raise_for_status()
-        batch = resp.json().get("items", [])
+        with inst.etapa("api_detalles"):
+            resp = requests.get(
+                f"{YOUTUBE_API_URL}/videos",
+                params={
+                    "key": API_KEY,
+                    "id": ",".join(chunk),
+                    "part": "snippet,contentDetails,statistics"
+                }
+            )
+            resp.raise_for_status()
+            batch = resp.json().get("items", [])
         log.info(f"🔍 videos.list: obtuvo {len(batch)} detalles")
         details.extend(batch)
     return details
@@ -99,12 +108,21 @@ def main():
     else:
         log.error("El CSV no tiene columnas esperadas.")
         return
+    # Handles/URLs sin ID (o con ID inválido) se resuelven con la caché de resolver_canales
+    if id_col == "channel_id":
+        registros = resolver_canales(df.fillna("").to_dict("records"), API_KEY)
+    else:
+        registros = df.to_dict("records")
+    canales = shard.filtrar(registros, col_id=id_col)
+    shard.registrar("shorts_analysis", canales, col_id=id_col)
+    df = pd.DataFrame(canales)
 
     summary_rows = []
     detail_rows = []
 
     for _, row in df.iterrows():
-        cid, cname = row[id_col], row[name_col]
+        # Título canónico resuelto por la API; la URL queda sólo si no se pudo resolver
+        cid, cname = row[id_col], row.get("titulo") or row[name_col]
         log.info(f"🔄 Procesando canal: {cname} ({cid})")
         items = get_shorts_for_channel(cid)
         ids = [i["id"]["videoId"] for i in items if i.get("id",{}).get("videoId")]
@@ -145,15 +163,18 @@ def main():
             "UltimoShort": last
         })
 
-        time.sleep(1)  # respetar rate limits
+        with inst.etapa("espera_rate_limit"):
+            time.sleep(1)  # respetar rate limits
 
     mes = datetime.utcnow().strftime("%Y-%m")
-    pd.DataFrame(summary_rows).to_csv(
-        OUTPUT_DIR / f"shorts_summary_{mes}.csv", index=False
-    )
-    pd.DataFrame(detail_rows).to_csv(
-        OUTPUT_DIR / f"shorts_details_{mes}.csv", index=False
-    )
+    with inst.etapa("escritura"):
+        pd.DataFrame(summary_rows).to_csv(
+            OUTPUT_DIR / f"shorts_summary_{mes}.csv", index=False
+        )
+        pd.DataFrame(detail_rows).to_csv(
+            OUTPUT_DIR / f"shorts_details_{mes}.csv", index=False
+        )
+    shard.completar("shorts_analysis")
     log.info(f"✅ Archivos guardados en {OUTPUT_DIR}")
 
 if __name__=="__main__":
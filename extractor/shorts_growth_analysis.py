@@ -19,8 +19,12 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from instrumentacion import iniciar_instrumentacion
+
 
 def main():
+    inst = iniciar_instrumentacion("shorts_growth_analysis")
+
     # Definir rutas
     INPUT_DIR = Path("data/shorts")
     OUTPUT_CSV = INPUT_DIR / "resumen_shorts.csv"
@@ -34,47 +38,50 @@ def main():
         return
 
     # Leer y concatenar todos los meses
-    df_list = []
-    for file in archivos:
-        periodo = file.stem.split('_')[1]
-        try:
-            df = pd.read_csv(file)
-            df["Periodo"] = pd.to_datetime(periodo, format="%Y-%m")
-            df_list.append(df)
-        except Exception as e:
-            print(f"⚠️ Error al leer {file}: {e}")
-
-    df_all = pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
+    with inst.etapa("carga"):
+        df_list = []
+        for file in archivos:
+            periodo = file.stem.split('_')[1]
+            try:
+                df = pd.read_csv(file)
+                df["Periodo"] = pd.to_datetime(periodo, format="%Y-%m")
+                df_list.append(df)
+            except Exception as e:
+                print(f"⚠️ Error al leer {file}: {e}")
+
+        df_all = pd.concat(df_list, ignore_index=True) if df_list else pd.DataFrame()
     if df_all.empty:
         print("⚠️ No hay datos para analizar después de concatenar.")
         return
 
-    # Asegurar formatos de fecha
-    df_all["Fecha"] = pd.to_datetime(df_all["Fecha"], errors='coerce')
-
-    # Agrupar por canal y período
-    resumen = df_all.groupby(["CanalID", "Nombre", "Periodo"]).agg({
-        "VideoID": "count",
-        "Vistas": "sum",
-        "Likes": "sum",
-        "Comentarios": "sum"
-    }).reset_index()
-
-    resumen = resumen.rename(columns={
-        "VideoID": "CantidadShorts",
-        "Vistas": "VistasTotales",
-        "Likes": "LikesTotales",
-        "Comentarios": "ComentariosTotales"
-    })
-
-    # Métricas derivadas
-    resumen["VistasPromedio"] = resumen["VistasTotales"] / resumen["CantidadShorts"]
-    resumen["EngagementRate"] = (
-        resumen["LikesTotales"] + resumen["ComentariosTotales"]
-    ) / resumen["VistasTotales"]
+    with inst.etapa("agregacion"):
+        # Asegurar formatos de fecha
+        df_all["Fecha"] = pd.to_datetime(df_all["Fecha"], errors='coerce')
+
+        # Agrupar por canal y período
+        resumen = df_all.groupby(["CanalID", "Nombre", "Periodo"]).agg({
+            "VideoID": "count",
+            "Vistas": "sum",
+            "Likes": "sum",
+            "Comentarios": "sum"
+        }).reset_index()
+
+        resumen = resumen.rename(columns={
+            "VideoID": "CantidadShorts",
+            "Vistas": "VistasTotales",
+            "Likes": "LikesTotales",
+            "Comentarios": "ComentariosTotales"
+        })
+
+        # Métricas derivadas
+        resumen["VistasPromedio"] = resumen["VistasTotales"] / resumen["CantidadShorts"]
+        resumen["EngagementRate"] = (
+            resumen["LikesTotales"] + resumen["ComentariosTotales"]
+        ) / resumen["VistasTotales"]
 
     # Guardar CSV de resumen
-    resumen.to_csv(OUTPUT_CSV, index=False)
+    with inst.etapa("escritura"):
+        resumen.to_csv(OUTPUT_CSV, index=False)
     print(f"✅ CSV resumen guardado en {OUTPUT_CSV}")
 
     # Función genérica de gráfico de línea
@@ -98,10 +105,11 @@ def main():
         plt.close()
 
     # Generar gráficos
-    plot_line(resumen, "CantidadShorts", "Shorts publicados por mes", "Cantidad de Shorts", "cantidad_shorts.png")
-    plot_line(resumen, "VistasTotales", "Vistas totales por mes", "Vistas Totales", "vistas_totales.png")
-    plot_line(resumen, "VistasPromedio", "Vistas promedio por Short", "Vistas Promedio", "vistas_promedio.png")
-    plot_line(resumen, "EngagementRate", "Engagement rate por mes", "Engagement Rate (likes+comentarios / vistas)", "engagement_rate.png")
+    with inst.etapa("graficos"):
+        plot_line(resumen, "CantidadShorts", "Shorts publicados por mes", "Cantidad de Shorts", "cantidad_shorts.png")
+        plot_line(resumen, "VistasTotales", "Vistas totales por mes", "Vistas Totales", "vistas_totales.png")
+        plot_line(resumen, "VistasPromedio", "Vistas promedio por Short", "Vistas Promedio", "vistas_promedio.png")
+        plot_line(resumen, "EngagementRate", "Engagement rate por mes", "Engagement Rate (likes+comentarios / vistas)", "engagement_rate.png")
 
     print(f"✅ Gráficos guardados en {GRAFICOS_DIR}")
 
@@ -1,17 +1,22 @@
-import os
 import csv
+import heapq
 import re
-import pandas as pd
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
 from googleapiclient.discovery import build
+from openpyxl import Workbook
 from dotenv import load_dotenv
 from dateutil import parser as dtparser
+from muestreo_vivos import cargar_concurrencia
+from instrumentacion import iniciar_instrumentacion
+from resolver_canales import resolver_canales
+from shards import iniciar_shard
 
 # ==== Configuración de carpetas ====
-def ensure_dirs():
-    (Path("data") / "canales").mkdir(parents=True, exist_ok=True)
-    (Path("data") / "videos").mkdir(parents=True, exist_ok=True)
+def ensure_dirs(base=Path("data")):
+    (base / "canales").mkdir(parents=True, exist_ok=True)
+    (base / "videos").mkdir(parents=True, exist_ok=True)
 
 # ==== Detección de plataformas ====
 PLATAFORMAS_PATTERNS = {
@@ -48,198 +53,295 @@ def get_month_year():
     now = datetime.now()
     return f"{now.month:02d}-{now.year}"
 
-def calculate_periodicity(fecha_list):
-    if len(fecha_list) < 2:
-        return None, None, None
-    fechas = sorted([dtparser.parse(f) for f in fecha_list])
-    dias = [(fechas[i] - fechas[i-1]).days for i in range(1, len(fechas))]
-    promedio_dias = sum(dias) / len(dias) if dias else None
-    frecuencia_mensual = len(fechas)
-    frecuencia_semanal = frecuencia_mensual / 4
-    frecuencia_diaria = frecuencia_mensual / 31
-    return round(promedio_dias, 2), round(frecuencia_semanal, 2), round(frecuencia_diaria, 2)
+# ==== Registros y columnas de salida ====
+COLUMNAS_VIDEOS = [
+    'channel_id', 'channel_title', 'month', 'video_id', 'video_url', 'title', 'published_at',
+    'duration_sec', 'view_count', 'like_count', 'comment_count', 'description', 'monetizacion',
+    'platforms', 'links', 'notas', 'peak_concurrent_viewers', 'avg_concurrent_viewers'
+]
+COLUMNAS_REPORTE = [
+    'CanalID', 'Nombre', 'URL', 'Descripcion', 'Pais', 'FechaCreacion', 'Suscriptores',
+    'VistasTotales', 'CantidadVideos', 'CantidadVivosMes', 'PromedioDiasEntreVivos',
+    'FrecuenciaSemanal', 'FrecuenciaDiaria', 'FechaPrimerVivoMes', 'FechaUltimoVivoMes',
+    'MonetizacionAlternativa_desc', 'Links_desc', 'Plataformas_desc', 'notas'
+]
+LOTE_DETALLES = 50  # IDs por llamada a videos.list
+TOP_N = 10
+
+
+@dataclass(slots=True)
+class VivoRegistro:
+    """Una fila de videos_MM-YYYY.csv, en el orden de COLUMNAS_VIDEOS."""
+    channel_id: str
+    channel_title: str
+    month: str
+    video_id: str
+    video_url: str
+    title: str
+    published_at: str
+    duration_sec: float | None
+    view_count: int
+    like_count: int
+    comment_count: int
+    description: str
+    monetizacion: str
+    platforms: str
+    links: str
+    notas: str
+    peak_concurrent_viewers: int | None
+    avg_concurrent_viewers: float | None
+
+    def fila(self):
+        return [getattr(self, col) for col in COLUMNAS_VIDEOS]
+
+
+@dataclass(slots=True)
+class EstadisticasVivos:
+    """Cantidad, primer y último vivo del mes acumulados a medida que llegan los registros."""
+    cantidad: int = 0
+    primero: str = ""
+    ultimo: str = ""
+
+    def agregar(self, fecha):
+        self.cantidad += 1
+        if fecha and (not self.primero or fecha < self.primero):
+            self.primero = fecha
+        if fecha and fecha > self.ultimo:
+            self.ultimo = fecha
+
+    def periodicidad(self):
+        """
+        Promedio de días entre vivos = (último − primero) / (cantidad − 1), que no
+        necesita guardar todas las fechas. Frecuencias sobre un mes de 4 semanas / 31 días.
+        """
+        if self.cantidad < 2:
+            return None, None, None
+        span = dtparser.parse(self.ultimo) - dtparser.parse(self.primero)
+        promedio_dias = span.total_seconds() / 86400 / (self.cantidad - 1)
+        return round(promedio_dias, 2), round(self.cantidad / 4, 2), round(self.cantidad / 31, 2)
+
+
+class EscritorTabla:
+    """Escribe filas a la vez en CSV y XLSX (openpyxl write_only) sin acumularlas en memoria.
+
+    Los archivos se crean recién con la primera fila, así un canal sin vivos no deja archivos vacíos;
+    con crear_vacio=True (el reporte mensual) se escriben igual, sólo con encabezados.
+    """
+
+    def __init__(self, ruta_csv, ruta_xlsx, columnas, crear_vacio=False):
+        self.ruta_csv, self.ruta_xlsx, self.columnas = Path(ruta_csv), Path(ruta_xlsx), columnas
+        self.crear_vacio = crear_vacio
+        self._csv = self._writer = self._libro = self._hoja = None
+
+    def _abrir(self):
+        self.ruta_csv.parent.mkdir(parents=True, exist_ok=True)
+        self._csv = open(self.ruta_csv, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._csv)
+        self._writer.writerow(self.columnas)
+        self._libro = Workbook(write_only=True)
+        self._hoja = self._libro.create_sheet('Sheet1')
+        self._hoja.append(self.columnas)
+
+    def escribir(self, fila):
+        if self._csv is None:
+            self._abrir()
+        self._writer.writerow(['' if v is None else v for v in fila])
+        self._hoja.append(fila)
+
+    def cerrar(self):
+        if self._csv is None and self.crear_vacio:
+            self._abrir()
+        if self._csv is not None:
+            self._csv.close()
+            self._libro.save(self.ruta_xlsx)
+            self._csv = self._writer = self._libro = self._hoja = None
+
+
+# ==== Pipeline por canal: descubrir → detalles → enriquecer → escribir ====
+def descubrir_vivos(youtube, channel_id, desde, inst):
+    """Genera páginas de hasta 50 IDs de vivos finalizados desde `desde`."""
+    next_token = None
+    while True:
+        with inst.etapa("api_busqueda"):
+            resp = youtube.search().list(
+                part='id', channelId=channel_id,
+                type='video', eventType='completed', publishedAfter=desde,
+                maxResults=50, pageToken=next_token
+            ).execute()
+        ids = [item['id']['videoId'] for item in resp.get('items', [])]
+        if ids:
+            yield ids
+        next_token = resp.get('nextPageToken')
+        if not next_token:
+            break
+
+
+def obtener_detalles(youtube, paginas_ids, inst):
+    """Genera los recursos de video de a uno, pidiendo hasta 50 IDs por llamada a videos.list."""
+    for ids in paginas_ids:
+        for i in range(0, len(ids), LOTE_DETALLES):
+            with inst.etapa("api_detalles"):
+                v_resp = youtube.videos().list(
+                    part='snippet,statistics,liveStreamingDetails', id=','.join(ids[i:i + LOTE_DETALLES])
+                ).execute()
+            yield from v_resp.get('items', [])
+
+
+def enriquecer(items, channel_id, nombre, month_year, concurrencia):
+    """Convierte cada recurso de la API en un VivoRegistro con plataformas, duración y concurrencia."""
+    for d in items:
+        snip, stats = d['snippet'], d.get('statistics', {})
+        live_det = d.get('liveStreamingDetails', {})
+        desc_video = snip.get('description', '')
+        plataformas_video = detect_platforms(desc_video)
+        start = live_det.get('actualStartTime')
+        end = live_det.get('actualEndTime')
+        dur = (dtparser.parse(end) - dtparser.parse(start)).total_seconds() if start and end else None
+        pico, promedio = concurrencia.get(d['id'], (None, None))
+        yield VivoRegistro(
+            channel_id=channel_id,
+            channel_title=nombre,
+            month=month_year,
+            video_id=d['id'],
+            video_url=f"https://www.youtube.com/watch?v={d['id']}",
+            title=snip.get('title', ''),
+            published_at=snip.get('publishedAt', ''),
+            duration_sec=dur,
+            view_count=int(stats.get('viewCount', 0) or 0),
+            like_count=int(stats.get('likeCount', 0) or 0),
+            comment_count=int(stats.get('commentCount', 0) or 0),
+            description=desc_video,
+            monetizacion=', '.join(plataformas_video) if plataformas_video else 'No',
+            platforms=', '.join(plataformas_video),
+            links=', '.join(extract_links(desc_video)),
+            notas='',
+            peak_concurrent_viewers=pico,
+            avg_concurrent_viewers=promedio,
+        )
+
+
+def escribir_vivos(registros, canal_videos_dir, month_year, inst):
+    """Escribe cada vivo apenas llega y mantiene sólo el top 10 por vistas en un heap."""
+    estadisticas = EstadisticasVivos()
+    top = []  # min-heap de (vistas, -orden, registro): ante empates queda el primero
+    videos = EscritorTabla(canal_videos_dir / f"videos_{month_year}.csv",
+                           canal_videos_dir / f"videos_{month_year}.xlsx", COLUMNAS_VIDEOS)
+    # Una sola etapa por canal: medir cada fila costaría dos snapshots con --trace-memory.
+    # Como los registros llegan de un generador, las etapas api_* quedan anidadas dentro.
+    with inst.etapa("vivos"):
+        for orden, reg in enumerate(registros):
+            estadisticas.agregar(reg.published_at)
+            entrada = (reg.view_count, -orden, reg)
+            if len(top) < TOP_N:
+                heapq.heappush(top, entrada)
+            elif entrada[:2] > top[0][:2]:
+                heapq.heapreplace(top, entrada)
+            videos.escribir(reg.fila())
+    with inst.etapa("escritura"):
+        videos.cerrar()
+        if top:
+            top10 = EscritorTabla(canal_videos_dir / f"top10_videos_{month_year}.csv",
+                                  canal_videos_dir / f"top10_videos_{month_year}.xlsx", COLUMNAS_VIDEOS)
+            for _, _, reg in sorted(top, key=lambda e: e[:2], reverse=True):
+                top10.escribir(reg.fila())
+            top10.cerrar()
+    return estadisticas
+
+
+def procesar_canal(youtube, canal, month_year, desde, concurrencia, inst, base=Path("data")):
+    """Devuelve la fila del reporte mensual de un canal, o None si hay que saltearlo."""
+    channel_id = canal.get('channel_id', '').strip()
+    channel_url = canal.get('channel_url', f'https://www.youtube.com/channel/{channel_id}').strip()
+
+    # Validar que el channel_id no esté vacío (canales recién agregados sin ID)
+    if not channel_id:
+        nombre_csv = canal.get('nombre', canal.get('name', 'Sin nombre'))
+        print(f"⚠️  Canal sin ID en channels.csv: {nombre_csv} — saltando")
+        return None
+
+    # Datos generales del canal
+    try:
+        with inst.etapa("api_canal"):
+            channel_resp = youtube.channels().list(part='snippet,statistics', id=channel_id).execute()
+    except Exception as e:
+        print(f"❌ Error consultando canal {channel_id}: {e} — saltando")
+        return None
+
+    # Canal eliminado, suspendido o ID inválido
+    if not channel_resp.get('items'):
+        print(f"⚠️  Canal no encontrado en YouTube (eliminado o ID inválido): {channel_id} — saltando")
+        return None
+
+    info = channel_resp['items'][0]
+    snippet, stats = info['snippet'], info['statistics']
+    desc = snippet.get('description', '')
+    plataformas_canal = detect_platforms(desc)
+    nombre = snippet.get('title', '')
+
+    # Vivos del mes: se descubren, detallan, enriquecen y escriben de a uno
+    canal_videos_dir = base / "videos" / f"canal_{channel_id}"
+    paginas = descubrir_vivos(youtube, channel_id, desde, inst)
+    registros = enriquecer(obtener_detalles(youtube, paginas, inst), channel_id, nombre, month_year, concurrencia)
+    estadisticas = escribir_vivos(registros, canal_videos_dir, month_year, inst)
+
+    if not estadisticas.cantidad:
+        print(f"🔸 Canal sin vivos este mes: {nombre}")
+    promedio_dias, frecuencia_sem, frecuencia_dia = estadisticas.periodicidad()
+    return {
+        'CanalID': channel_id,
+        'Nombre': nombre,
+        'URL': channel_url,
+        'Descripcion': desc,
+        'Pais': snippet.get('country', 'Argentina'),
+        'FechaCreacion': snippet.get('publishedAt', ''),
+        'Suscriptores': stats.get('subscriberCount', '0'),
+        'VistasTotales': stats.get('viewCount', '0'),
+        'CantidadVideos': stats.get('videoCount', '0'),
+        'CantidadVivosMes': estadisticas.cantidad,
+        'PromedioDiasEntreVivos': promedio_dias or '',
+        'FrecuenciaSemanal': frecuencia_sem or '',
+        'FrecuenciaDiaria': frecuencia_dia or '',
+        'FechaPrimerVivoMes': estadisticas.primero,
+        'FechaUltimoVivoMes': estadisticas.ultimo,
+        'MonetizacionAlternativa_desc': ', '.join(plataformas_canal) if plataformas_canal else 'No',
+        'Links_desc': ', '.join(extract_links(desc)),
+        'Plataformas_desc': ', '.join(plataformas_canal),
+        'notas': '' if estadisticas.cantidad else 'Sin vivos en el mes'
+    }
 
 # ==== MAIN ====
 def main():
-    ensure_dirs()
+    inst = iniciar_instrumentacion("youtube_report")
+    # Con --shard i/N se procesa sólo una partición de canales y se escribe en data/parciales/
+    shard = iniciar_shard()
+    base = shard.directorio()
+    ensure_dirs(base)
     load_dotenv()
-    API_KEY = os.getenv('YOUTUBE_API_KEY')
+    API_KEY = shard.api_key()
     youtube = build('youtube', 'v3', developerKey=API_KEY)
     month_year = get_month_year()
+    fecha_hace_un_mes = (datetime.utcnow() - timedelta(days=31)).isoformat("T") + "Z"
 
-    # Leer canales
+    # Leer canales y resolver handles/URLs a channel_id (con caché en data/cache/)
     with open('extractor/channels.csv', newline='', encoding='utf-8') as csvfile:
-        canales = list(csv.DictReader(csvfile))
+        canales = shard.filtrar(resolver_canales(csv.DictReader(csvfile), API_KEY))
+    shard.registrar("youtube_report", canales)
 
-    resumen_canales = []
+    # Pico y promedio de espectadores concurrentes medidos por muestreo_vivos.py
+    concurrencia = cargar_concurrencia()
 
+    # El resumen de canales también se escribe fila a fila
+    out_general = base / "canales" / f"report_{month_year}.csv"
+    reporte = EscritorTabla(out_general, base / "canales" / f"report_{month_year}.xlsx", COLUMNAS_REPORTE,
+                            crear_vacio=True)
     for canal in canales:
-        channel_id = canal.get('channel_id', '').strip()
-        channel_url = canal.get('channel_url', f'https://www.youtube.com/channel/{channel_id}').strip()
-
-        # Validar que el channel_id no esté vacío (canales recién agregados sin ID)
-        if not channel_id:
-            nombre_csv = canal.get('nombre', canal.get('name', 'Sin nombre'))
-            print(f"⚠️  Canal sin ID en channels.csv: {nombre_csv} — saltando")
-            continue
-
-        # Datos generales del canal
-        try:
-            channel_resp = youtube.channels().list(part='snippet,statistics', id=channel_id).execute()
-        except Exception as e:
-            print(f"❌ Error consultando canal {channel_id}: {e} — saltando")
-            continue
-
-        # Canal eliminado, suspendido o ID inválido
-        if not channel_resp.get('items'):
-            print(f"⚠️  Canal no encontrado en YouTube (eliminado o ID inválido): {channel_id} — saltando")
-            continue
-
-        info = channel_resp['items'][0]
-        snippet, stats = info['snippet'], info['statistics']
-        desc = snippet.get('description', '')
-        plataformas_canal = detect_platforms(desc)
-        links_canal = extract_links(desc)
-        monet_canal = ', '.join(plataformas_canal) if plataformas_canal else 'No'
-
-        nombre = snippet.get('title', '')
-        pais = snippet.get('country', 'Argentina')
-        fecha_creacion = snippet.get('publishedAt', '')
-        subs = stats.get('subscriberCount', '0')
-        vistas = stats.get('viewCount', '0')
-        video_count = stats.get('videoCount', '0')
-
-        # Buscar todos los vivos del mes (paginando)
-        fecha_hace_un_mes = (datetime.utcnow() - timedelta(days=31)).isoformat("T") + "Z"
-        vivos = []
-        next_token = None
-        while True:
-            resp = youtube.search().list(
-                part='id,snippet', channelId=channel_id,
-                type='video', eventType='completed', publishedAfter=fecha_hace_un_mes,
-                maxResults=50, pageToken=next_token
-            ).execute()
-            for item in resp.get('items', []):
-                vivos.append({
-                    'video_id': item['id']['videoId'],
-                    'title': item['snippet']['title'],
-                    'published_at': item['snippet']['publishedAt']
-                })
-            next_token = resp.get('nextPageToken')
-            if not next_token:
-                break
-
-        # Obtener detalles de cada video
-        vivos_detalles, fechas_vivos = [], []
-        for v in vivos:
-            v_resp = youtube.videos().list(
-                part='snippet,statistics,liveStreamingDetails', id=v['video_id']
-            ).execute()
-            if not v_resp.get('items'):
-                continue
-            d = v_resp['items'][0]
-            snip, stats = d['snippet'], d['statistics']
-            live_det = d.get('liveStreamingDetails', {})
-            desc_video = snip.get('description', '')
-            plataformas_video = detect_platforms(desc_video)
-            links_video = extract_links(desc_video)
-            fecha_video = snip.get('publishedAt', '')
-            fechas_vivos.append(fecha_video)
-            start = live_det.get('actualStartTime')
-            end = live_det.get('actualEndTime')
-            dur = (dtparser.parse(end) - dtparser.parse(start)).total_seconds() if start and end else None
-            vivos_detalles.append({
-                'channel_id': channel_id,
-                'channel_title': nombre,
-                'month': month_year,
-                'video_id': v['video_id'],
-                'video_url': f"https://www.youtube.com/watch?v={v['video_id']}",
-                'title': snip.get('title', ''),
-                'published_at': fecha_video,
-                'duration_sec': dur,
-                'view_count': stats.get('viewCount', '0'),
-                'like_count': stats.get('likeCount', '0'),
-                'comment_count': stats.get('commentCount', '0'),
-                'description': desc_video,
-                'monetizacion': ', '.join(plataformas_video) if plataformas_video else 'No',
-                'platforms': ', '.join(plataformas_video),
-                'links': ', '.join(links_video),
-                'notas': ''
-            })
-
-        # Verificar si hubo vivos este mes
-        if not vivos_detalles:
-            print(f"🔸 Canal sin vivos este mes: {nombre}")
-            resumen_canales.append({
-                'CanalID': channel_id,
-                'Nombre': nombre,
-                'URL': channel_url,
-                'Descripcion': desc,
-                'Pais': pais,
-                'FechaCreacion': fecha_creacion,
-                'Suscriptores': subs,
-                'VistasTotales': vistas,
-                'CantidadVideos': video_count,
-                'CantidadVivosMes': 0,
-                'PromedioDiasEntreVivos': '',
-                'FrecuenciaSemanal': '',
-                'FrecuenciaDiaria': '',
-                'FechaPrimerVivoMes': '',
-                'FechaUltimoVivoMes': '',
-                'MonetizacionAlternativa_desc': monet_canal,
-                'Links_desc': ', '.join(links_canal),
-                'Plataformas_desc': ', '.join(plataformas_canal),
-                'notas': 'Sin vivos en el mes'
-            })
-            continue
-
-        # Top 10 más vistos (asegurar valores numéricos)
-        df_videos = pd.DataFrame(vivos_detalles)
-        for col in ['view_count', 'like_count', 'comment_count']:
-            df_videos[col] = pd.to_numeric(df_videos[col], errors='coerce').fillna(0).astype(int)
-        df_top10 = df_videos.sort_values(by='view_count', ascending=False).head(10)
-
-        # Periodicidad y frecuencia
-        promedio_dias, frecuencia_sem, frecuencia_dia = calculate_periodicity(fechas_vivos)
-        cantidad_vivos = len(vivos_detalles)
-        primer_vivo = min(fechas_vivos) if fechas_vivos else ""
-        ultimo_vivo = max(fechas_vivos) if fechas_vivos else ""
-
-        # Guardar archivos
-        canal_videos_dir = Path("data/videos") / f"canal_{channel_id}"
-        canal_videos_dir.mkdir(parents=True, exist_ok=True)
-        df_videos.to_csv(canal_videos_dir / f"videos_{month_year}.csv", index=False)
-        df_top10.to_csv(canal_videos_dir / f"top10_videos_{month_year}.csv", index=False)
-        df_videos.to_excel(canal_videos_dir / f"videos_{month_year}.xlsx", index=False)
-        df_top10.to_excel(canal_videos_dir / f"top10_videos_{month_year}.xlsx", index=False)
-
-        resumen_canales.append({
-            'CanalID': channel_id,
-            'Nombre': nombre,
-            'URL': channel_url,
-            'Descripcion': desc,
-            'Pais': pais,
-            'FechaCreacion': fecha_creacion,
-            'Suscriptores': subs,
-            'VistasTotales': vistas,
-            'CantidadVideos': video_count,
-            'CantidadVivosMes': cantidad_vivos,
-            'PromedioDiasEntreVivos': promedio_dias or '',
-            'FrecuenciaSemanal': frecuencia_sem or '',
-            'FrecuenciaDiaria': frecuencia_dia or '',
-            'FechaPrimerVivoMes': primer_vivo,
-            'FechaUltimoVivoMes': ultimo_vivo,
-            'MonetizacionAlternativa_desc': monet_canal,
-            'Links_desc': ', '.join(links_canal),
-            'Plataformas_desc': ', '.join(plataformas_canal),
-            'notas': ''
-        })
-
-    # Guardar archivo resumen de canales
-    out_general = Path("data/canales") / f"report_{month_year}.csv"
-    df_general = pd.DataFrame(resumen_canales)
-    df_general.to_csv(out_general, index=False)
-    df_general.to_excel(Path("data/canales") / f"report_{month_year}.xlsx", index=False)
+        fila = procesar_canal(youtube, canal, month_year, fecha_hace_un_mes, concurrencia, inst, base)
+        if fila is not None:
+            with inst.etapa("escritura"):
+                reporte.escribir([fila[col] for col in COLUMNAS_REPORTE])
+    with inst.etapa("escritura"):
+        reporte.cerrar()
+    shard.completar("youtube_report")
     print(f"✅ Reporte generado: {out_general}")
 
 if __name__ == "__main__":
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Servicio HTTP local de sólo lectura sobre los datos de data/.
+
+Carga una única vez el panel de canales (data/canales/report_*.csv), los
+videos de vivos (data/videos/canal_*/videos_*.csv), los Shorts
+(data/shorts_stats/shorts_details_*.csv) y las dimensiones provincia/tipo de
+extractor/channels.csv, y responde JSON desde índices precalculados:
+
+    GET /api/dimensiones                  valores disponibles para cada filtro
+    GET /api/canales                      panel mensual de canales
+    GET /api/videos                       vivos con sus métricas
+    GET /api/shorts                       Shorts agregados por canal y mes
+    GET /api/rankings/{videos|shorts|canales}
+
+Filtros (todos opcionales, admiten varios valores separados por coma):
+    canal=<CanalID>  mes=<MM-YYYY|YYYY-MM>  provincia=<...>  tipo=<...>
+Paginación: limite=<n> (default 100, rankings 10) y desde=<n>.
+
+Las respuestas se cachean (LRU) y llevan ETag; con If-None-Match se responde 304.
+
+Uso:
+    python frontend/servidor_datos.py [--puerto 8000] [--host 127.0.0.1]
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path("data")
+CHANNELS_FILE = Path("extractor/channels.csv")
+
+FILTROS = ("canal", "mes", "provincia", "tipo")
+COLUMNAS_PANEL = [
+    "CanalID", "Nombre", "Suscriptores", "VistasTotales", "CantidadVideos",
+    "CantidadVivosMes", "FrecuenciaSemanal", "MonetizacionAlternativa_desc"
+]
+COLUMNAS_VIDEOS = [
+    "channel_id", "channel_title", "video_id", "title", "published_at",
+    "duration_sec", "view_count", "like_count", "comment_count", "monetizacion",
+    "peak_concurrent_viewers", "avg_concurrent_viewers"
+]
+VACIO = np.array([], dtype=np.intp)
+
+
+def normalizar_mes(valor):
+    """Acepta MM-YYYY o YYYY-MM y devuelve MM-YYYY, el formato de data/canales."""
+    m = re.fullmatch(r"(\d{4})-(\d{2})", valor)
+    return f"{m.group(2)}-{m.group(1)}" if m else valor
+
+
+def periodo_ordenable(mes):
+    mm, yyyy = mes.split("-")
+    return f"{yyyy}-{mm}"
+
+
+def compactar(df, categoricas):
+    """Reduce memoria: strings repetidos a categorías y números al menor tipo posible."""
+    for col in df.columns:
+        if col in categoricas:
+            df[col] = df[col].astype("category")
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="float")
+    return df
+
+
+class Tabla:
+    """DataFrame inmutable con un índice invertido (valor → posiciones) por filtro."""
+
+    def __init__(self, df, dimensiones):
+        self.df = df.reset_index(drop=True)
+        self.indices = {
+            filtro: {str(k): v for k, v in self.df.groupby(col, observed=True).indices.items()}
+            for filtro, col in dimensiones.items()
+        }
+
+    def valores(self, filtro):
+        if filtro == "mes":
+            return sorted(self.indices[filtro], key=periodo_ordenable)
+        return sorted(self.indices[filtro])
+
+    def filtrar(self, filtros):
+        seleccion = None
+        for filtro, valores in filtros.items():
+            indice = self.indices.get(filtro)
+            if indice is None:
+                continue
+            partes = [indice.get(v, VACIO) for v in valores]
+            pos = partes[0] if len(partes) == 1 else np.unique(np.concatenate(partes))
+            seleccion = pos if seleccion is None else np.intersect1d(seleccion, pos, assume_unique=True)
+        return self.df if seleccion is None else self.df.iloc[seleccion]
+
+
+# ==== Carga ====
+def cargar_dimensiones():
+    canales = pd.read_csv(CHANNELS_FILE, usecols=["channel_id", "provincia", "tipo"], dtype=str)
+    return canales.drop_duplicates("channel_id").set_index("channel_id")
+
+
+def con_dimensiones(df, col_id, dims):
+    df["provincia"] = df[col_id].map(dims["provincia"]).fillna("Sin dato")
+    df["tipo"] = df[col_id].map(dims["tipo"]).fillna("Sin dato")
+    return df
+
+
+def cargar_panel(dims):
+    partes = []
+    for archivo in sorted((DATA_DIR / "canales").glob("report_*.csv")):
+        df = pd.read_csv(archivo, usecols=lambda c: c in COLUMNAS_PANEL)
+        df["mes"] = archivo.stem.replace("report_", "")
+        partes.append(df)
+    df = pd.concat(partes, ignore_index=True)
+    for col in ["Suscriptores", "VistasTotales", "CantidadVideos", "CantidadVivosMes"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int64")
+    df["periodo"] = df["mes"].map(periodo_ordenable)
+    df = df.sort_values(["CanalID", "periodo"])
+    previo = df.groupby("CanalID")[["VistasTotales", "Suscriptores"]].shift(1)
+    df["VistasMes"] = df["VistasTotales"] - previo["VistasTotales"]
+    df["SuscriptoresMes"] = df["Suscriptores"] - previo["Suscriptores"]
+    df = con_dimensiones(df, "CanalID", dims)
+    return compactar(df, {"CanalID", "Nombre", "mes", "periodo", "provincia", "tipo",
+                          "MonetizacionAlternativa_desc"})
+
+
+def cargar_videos(dims):
+    partes = []
+    for archivo in sorted((DATA_DIR / "videos").glob("canal_*/videos_*.csv")):
+        df = pd.read_csv(archivo, usecols=lambda c: c in COLUMNAS_VIDEOS)
+        df["mes"] = archivo.stem.replace("videos_", "")
+        partes.append(df)
+    df = pd.concat(partes, ignore_index=True).drop_duplicates(["video_id", "mes"])
+    for col in ["view_count", "like_count", "comment_count"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int64")
+    df = con_dimensiones(df, "channel_id", dims)
+    return compactar(df, {"channel_id", "channel_title", "mes", "provincia", "tipo", "monetizacion"})
+
+
+def cargar_shorts(dims):
+    partes = []
+    for archivo in sorted((DATA_DIR / "shorts_stats").glob("shorts_details_*.csv")):
+        df = pd.read_csv(archivo)
+        if df.empty:
+            continue
+        df["mes"] = normalizar_mes(archivo.stem.replace("shorts_details_", ""))
+        partes.append(df)
+    df = pd.concat(partes, ignore_index=True)
+    resumen = df.groupby(["CanalID", "mes"], as_index=False).agg(
+        CantidadShorts=("VideoID", "count"),
+        Vistas=("Vistas", "sum"),
+        Likes=("Likes", "sum"),
+        Comentarios=("Comentarios", "sum"),
+    )
+    top = df.sort_values("Vistas", ascending=False).drop_duplicates(["CanalID", "mes", "VideoID"])
+    top = top[["CanalID", "mes", "VideoID", "Titulo", "Fecha", "Vistas", "Likes", "Comentarios"]]
+    resumen = con_dimensiones(resumen, "CanalID", dims)
+    top = con_dimensiones(top, "CanalID", dims)
+    categoricas = {"CanalID", "mes", "provincia", "tipo"}
+    return compactar(resumen, categoricas), compactar(top, categoricas)
+
+
+class Datos:
+    def __init__(self):
+        dims = cargar_dimensiones()
+        panel = cargar_panel(dims)
+        videos = cargar_videos(dims)
+        shorts, shorts_detalle = cargar_shorts(dims)
+        self.canales = Tabla(panel, {"canal": "CanalID", "mes": "mes", "provincia": "provincia", "tipo": "tipo"})
+        self.videos = Tabla(videos, {"canal": "channel_id", "mes": "mes", "provincia": "provincia", "tipo": "tipo"})
+        self.shorts = Tabla(shorts, {"canal": "CanalID", "mes": "mes", "provincia": "provincia", "tipo": "tipo"})
+        self.shorts_detalle = Tabla(shorts_detalle, {"canal": "CanalID", "mes": "mes", "provincia": "provincia", "tipo": "tipo"})
+        # Huella de los archivos cargados: cambia el ETag si se reinicia con datos nuevos
+        huella = hashlib.sha1()
+        for archivo in sorted(DATA_DIR.glob("**/*.csv")):
+            huella.update(f"{archivo}:{archivo.stat().st_size}".encode())
+        self.version = huella.hexdigest()[:12]
+
+
+DATOS = None
+
+
+# ==== Consultas ====
+def paginar(df, params, limite_default=100):
+    desde = int(params.get("desde", ["0"])[0])
+    limite = min(int(params.get("limite", [str(limite_default)])[0]), 5000)
+    return {"total": len(df), "desde": desde, "filas": registros(df.iloc[desde:desde + limite])}
+
+
+def ranking(df, columna, params):
+    limite = min(int(params.get("limite", ["10"])[0]), 500)
+    return {"total": len(df), "filas": registros(df.nlargest(limite, columna))}
+
+
+def registros(df):
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+RUTAS = {
+    "/api/dimensiones": lambda f, p: {
+        filtro: DATOS.canales.valores(filtro) for filtro in FILTROS
+    },
+    "/api/canales": lambda f, p: paginar(DATOS.canales.filtrar(f).sort_values(["periodo", "CanalID"]), p),
+    "/api/videos": lambda f, p: paginar(DATOS.videos.filtrar(f).sort_values("view_count", ascending=False), p),
+    "/api/shorts": lambda f, p: paginar(DATOS.shorts.filtrar(f).sort_values("Vistas", ascending=False), p),
+    "/api/rankings/videos": lambda f, p: ranking(DATOS.videos.filtrar(f), "view_count", p),
+    "/api/rankings/shorts": lambda f, p: ranking(DATOS.shorts_detalle.filtrar(f), "Vistas", p),
+    "/api/rankings/canales": lambda f, p: ranking(DATOS.canales.filtrar(f).dropna(subset=["VistasMes"]), "VistasMes", p),
+}
+
+
+@lru_cache(maxsize=512)
+def responder(ruta, consulta):
+    """Devuelve (cuerpo JSON, ETag) para una ruta y una consulta ya normalizada."""
+    params = {k: list(v) for k, v in consulta}
+    filtros = {k: v for k, v in params.items() if k in FILTROS}
+    cuerpo = json.dumps(RUTAS[ruta](filtros, params), ensure_ascii=False).encode("utf-8")
+    etag = '"' + DATOS.version + "-" + hashlib.sha1(cuerpo).hexdigest()[:16] + '"'
+    return cuerpo, etag
+
+
+def normalizar_consulta(query):
+    params = {}
+    for clave, valores in parse_qs(query).items():
+        partes = [p.strip() for v in valores for p in v.split(",") if p.strip()]
+        if clave == "mes":
+            partes = [normalizar_mes(p) for p in partes]
+        params[clave] = tuple(sorted(set(partes)))
+    return tuple(sorted(params.items()))
+
+
+class Manejador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        ruta = url.path.rstrip("/") or "/"
+        if ruta not in RUTAS:
+            return self.enviar(404, json.dumps({"error": f"Ruta desconocida: {ruta}"}).encode())
+        try:
+            cuerpo, etag = responder(ruta, normalizar_consulta(url.query))
+        except ValueError as e:
+            return self.enviar(400, json.dumps({"error": f"Parámetro inválido: {e}"}, ensure_ascii=False).encode("utf-8"))
+        if self.headers.get("If-None-Match") == etag:
+            return self.enviar(304, b"", etag)
+        self.enviar(200, cuerpo, etag)
+
+    def enviar(self, estado, cuerpo, etag=None):
+        self.send_response(estado)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        if estado != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        if estado != 304:
+            self.wfile.write(cuerpo)
+
+
+def main():
+    global DATOS
+    ap = argparse.ArgumentParser(description="Servicio JSON local sobre los datos del reporte.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, default=8000)
+    args = ap.parse_args()
+
+    DATOS = Datos()
+    print(f"📦 Datos cargados: {len(DATOS.canales.df)} filas de panel, "
+          f"{len(DATOS.videos.df)} vivos, {len(DATOS.shorts_detalle.df)} shorts")
+    servidor = ThreadingHTTPServer((args.host, args.puerto), Manejador)
+    print(f"✅ Sirviendo en http://{args.host}:{args.puerto}/api/dimensiones")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()